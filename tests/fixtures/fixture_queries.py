@@ -0,0 +1,25 @@
+import pytest
+from core.query_guard import (
+    QueryRecorder,
+    assert_max_queries,
+    assert_queries_do_not_scale,
+)
+
+
+@pytest.fixture
+def query_recorder():
+    return QueryRecorder()
+
+
+@pytest.fixture
+def max_queries(settings):
+    # без кеша страниц и фрагментов меряется полный путь рендера
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    }
+    return assert_max_queries
+
+
+@pytest.fixture
+def queries_do_not_scale(max_queries):
+    return assert_queries_do_not_scale
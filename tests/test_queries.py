@@ -0,0 +1,25 @@
+import pytest
+from posts.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestQueryGuard:
+
+    def test_index_queries_do_not_scale(self, client, user, queries_do_not_scale):
+        Post.objects.create(text='Тестовый пост', author=user)
+
+        def add_posts():
+            Post.objects.bulk_create(
+                Post(text=f'Пост {i}', author=user) for i in range(10)
+            )
+
+        queries_do_not_scale(lambda: client.get('/'), add_posts, '/')
+
+    def test_index_within_budget(self, client, user, max_queries):
+        Post.objects.create(text='Тестовый пост', author=user)
+        with max_queries(2, '/'):
+            client.get('/')
+        with pytest.raises(AssertionError):
+            with max_queries(0, '/'):
+                client.get('/')
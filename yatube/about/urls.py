@@ -1,4 +1,5 @@
 from django.urls import path
+from core.replicas import read_only_view
 from . import views
 
 
@@ -6,6 +7,14 @@ app_name = 'about'
 
 
 urlpatterns = [
-    path('author/', views.AboutAuthorView.as_view(), name='author'),
-    path('tech/', views.AboutTechView.as_view(), name='tech')
+    path(
+        'author/',
+        read_only_view(views.AboutAuthorView.as_view()),
+        name='author'
+    ),
+    path(
+        'tech/',
+        read_only_view(views.AboutTechView.as_view()),
+        name='tech'
+    )
 ]
@@ -0,0 +1,139 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+POSTS_IN_TEST_DB = POSTS_PER_PAGE + 3
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        for i in range(POSTS_IN_TEST_DB):
+            cls.post = Post.objects.create(
+                author=cls.user_author,
+                group=cls.group,
+                text=f'Тестовый текст поста {i}'
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Тестовый комментарий')
+        Follow.objects.create(user=cls.user, author=cls.user_author)
+        cls.index_url = reverse('api:index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_listings_paginate_by_cursor(self):
+        """Ленты отдают посты страницами и листаются курсором"""
+        urls = [
+            self.index_url,
+            reverse('api:group_posts', args=[self.group.slug]),
+            reverse('api:profile', args=[self.user_author.username]),
+            reverse('api:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.authorized_client.get(url).json()
+                self.assertEqual(len(data['results']), POSTS_PER_PAGE)
+                self.assertEqual(data['results'][0]['id'], self.post.pk)
+                self.assertIsNone(data['previous'])
+                data = self.authorized_client.get(data['next']).json()
+                self.assertEqual(
+                    len(data['results']), POSTS_IN_TEST_DB - POSTS_PER_PAGE)
+                self.assertIsNone(data['next'])
+
+    def test_post_serialization(self):
+        """Пост сериализуется компактно, с автором и группой"""
+        data = self.guest_client.get(
+            reverse('api:post_detail', args=[self.post.pk])).json()
+        self.assertEqual(data, {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': self.user_author.username,
+            'group': {'slug': self.group.slug, 'title': self.group.title},
+            'image': None,
+            'image_width': None,
+            'image_height': None,
+            'comments_count': 1,
+        })
+        data = self.guest_client.get(
+            reverse('api:post_comments', args=[self.post.pk])).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Тестовый комментарий'])
+
+    def test_profile_and_group_details(self):
+        """Профиль и группа отдаются вместе со своими постами"""
+        data = self.guest_client.get(
+            reverse('api:profile', args=[self.user_author.username])).json()
+        self.assertEqual(data['author']['posts_count'], POSTS_IN_TEST_DB)
+        self.assertEqual(data['author']['followers_count'], 1)
+        data = self.guest_client.get(
+            reverse('api:group_posts', args=[self.group.slug])).json()
+        self.assertEqual(data['group']['description'], self.group.description)
+
+    def test_errors(self):
+        """Несуществующие объекты - 404, лента без входа - 401"""
+        urls = [
+            reverse('api:group_posts', args=['missing']),
+            reverse('api:profile', args=['missing']),
+            reverse('api:post_detail', args=[0]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+        response = self.guest_client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_conditional_get(self):
+        """Неизменившаяся лента отвечает 304 без запросов к БД"""
+        self.guest_client.get(self.index_url)
+        # Last-Modified отдаётся, когда секунда изменения закончилась
+        with mock.patch('time.time', return_value=time.time() + 2):
+            response = self.guest_client.get(self.index_url)
+            etag = response['ETag']
+            last_modified = response['Last-Modified']
+            with self.assertNumQueries(0):
+                response = self.guest_client.get(
+                    self.index_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+            with self.assertNumQueries(0):
+                response = self.guest_client.get(
+                    self.index_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.user_author, text='Новый пост')
+        response = self.guest_client.get(
+            self.index_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_conditional_get_for_profile_skips_db(self):
+        """Области профиля вычисляются из кэша, без запросов к БД"""
+        url = reverse('api:profile', args=[self.user_author.username])
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
@@ -0,0 +1,155 @@
+from functools import wraps
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils.http import urlencode
+
+from core.replicas import read_only_view
+from posts.counters import get_author_stats
+from posts.models import FeedEntry, Group, Post
+from posts.page_cache import (
+    cached_page,
+    follow_index_scopes,
+    group_scopes,
+    index_scopes,
+    page_validators,
+    post_comments_scopes,
+    post_detail_scopes,
+    profile_scopes,
+)
+from posts.utils import POSTS_PER_PAGE, CursorPaginator, comments_page
+from .serializers import (
+    serialize_author,
+    serialize_comment,
+    serialize_group,
+    serialize_post,
+)
+
+User = get_user_model()
+
+# только поля, которые попадают в ответ
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'image_width', 'image_height',
+    'comments_count', 'author', 'group',
+    'author__username', 'group__slug', 'group__title',
+)
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=HTTPStatus.OK):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def not_found():
+    return json_response({'detail': 'Не найдено'}, HTTPStatus.NOT_FOUND)
+
+
+def api_login_required(view):
+    """Как login_required, но вместо редиректа отвечает 401"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response(
+                {'detail': 'Требуется авторизация'}, HTTPStatus.UNAUTHORIZED)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def posts_queryset():
+    return Post.objects.select_related('author', 'group').only(*POST_FIELDS)
+
+
+def cursor_link(request, cursor):
+    if cursor is None:
+        return None
+    return f'{request.path}?{urlencode({"cursor": cursor})}'
+
+
+def page_response(request, page, results, **extra):
+    return json_response({
+        **extra,
+        'results': results,
+        'next': cursor_link(request, page.next_cursor),
+        'previous': cursor_link(request, page.previous_cursor),
+    })
+
+
+def posts_page(request, posts):
+    page = CursorPaginator(posts, POSTS_PER_PAGE).get_page(
+        request.GET.get('cursor'))
+    return page, [serialize_post(post) for post in page]
+
+
+@read_only_view
+@page_validators(index_scopes)
+@cached_page(index_scopes)
+def index(request):
+    page, results = posts_page(request, posts_queryset())
+    return page_response(request, page, results)
+
+
+@read_only_view
+@page_validators(group_scopes)
+@cached_page(group_scopes)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return not_found()
+    page, results = posts_page(
+        request, posts_queryset().filter(group=group))
+    return page_response(
+        request, page, results,
+        group={**serialize_group(group), 'description': group.description})
+
+
+@read_only_view
+@page_validators(profile_scopes)
+@cached_page(profile_scopes)
+def profile(request, username):
+    author = User.objects.select_related('stats').filter(
+        username=username).first()
+    if author is None:
+        return not_found()
+    page, results = posts_page(
+        request, posts_queryset().filter(author=author))
+    return page_response(
+        request, page, results,
+        author=serialize_author(author, get_author_stats(author)))
+
+
+@read_only_view
+@api_login_required
+@page_validators(follow_index_scopes)
+@cached_page(follow_index_scopes)
+def follow_index(request):
+    entries = FeedEntry.objects.filter(user=request.user).select_related(
+        'post__author', 'post__group').only(
+        'id', 'pub_date', 'post',
+        *(f'post__{field}' for field in POST_FIELDS))
+    page = CursorPaginator(entries, POSTS_PER_PAGE).get_page(
+        request.GET.get('cursor'))
+    results = [serialize_post(entry.post) for entry in page]
+    return page_response(request, page, results)
+
+
+@read_only_view
+@page_validators(post_detail_scopes)
+@cached_page(post_detail_scopes)
+def post_detail(request, post_id):
+    post = posts_queryset().filter(pk=post_id).first()
+    if post is None:
+        return not_found()
+    return json_response(serialize_post(post))
+
+
+@read_only_view
+@page_validators(post_comments_scopes)
+@cached_page(post_comments_scopes)
+def post_comments(request, post_id):
+    post = Post.objects.only('id').filter(pk=post_id).first()
+    if post is None:
+        return not_found()
+    page = comments_page(post, request.GET.get('cursor'))
+    return page_response(
+        request, page, [serialize_comment(comment) for comment in page])
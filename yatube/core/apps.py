@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core.checks import Tags, register
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .caches import check_shared_caches
+        from .db import configure_sqlite
+        connection_created.connect(configure_sqlite)
+        register(check_shared_caches, Tags.caches, deploy=True)
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning
+
+# бэкенды, у которых в каждом процессе своё содержимое
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+# сколько хранить данные, которые другие процессы должны видеть
+# изменёнными, если кэш у каждого процесса свой
+LOCAL_CACHE_TIMEOUT = 30
+
+
+def is_shared(alias='default'):
+    """Кэш общий для всех процессов (memcached, Redis, файлы, БД)"""
+    return not isinstance(caches[alias], LOCAL_CACHE_BACKENDS)
+
+
+def shared_timeout(timeout=None, alias='default'):
+    """Время жизни записи, которую сбрасывают при изменении данных.
+
+    С общим кэшем сброс видят все процессы, и запись может жить
+    timeout (None - бессрочно). С локальным кэшем сброс виден только
+    в процессе, который его сделал, поэтому запись живёт не дольше
+    LOCAL_CACHE_TIMEOUT.
+    """
+    if is_shared(alias):
+        return timeout
+    if timeout is None:
+        return LOCAL_CACHE_TIMEOUT
+    return min(timeout, LOCAL_CACHE_TIMEOUT)
+
+
+def check_shared_caches(app_configs, **kwargs):
+    """manage.py check --deploy: в бою кэши должны быть общими"""
+    return [
+        Warning(
+            f'Кэш {alias!r} хранится отдельно в каждом процессе.',
+            hint=(
+                'Сброс страниц, блокировка пересборки и миниатюры '
+                'не будут согласованы между процессами; кэшированные '
+                f'данные живут не дольше {LOCAL_CACHE_TIMEOUT} с. '
+                'Укажите memcached, Redis или другой общий бэкенд.'
+            ),
+            id='core.W001',
+        )
+        for alias in sorted(settings.CACHES)
+        if not is_shared(alias)
+    ]
@@ -0,0 +1,155 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_sqlite_pragmas
+
+# таймаут ожидания блокировки по умолчанию, как у Django, секунды
+DEFAULT_TIMEOUT = 5
+READ_LIMIT = 10
+SCHEMA = (
+    'CREATE TABLE post ('
+    ' id INTEGER PRIMARY KEY, author_id INTEGER, text TEXT, pub_date REAL)',
+    'CREATE INDEX post_author_pub_date ON post (author_id, pub_date DESC)',
+)
+AUTHORS = 100
+
+
+class Workload:
+    """Параллельные читатели и писатели поверх одного файла БД.
+
+    Без постоянных соединений каждая операция открывает новое
+    соединение, как запрос Django при CONN_MAX_AGE=0.
+    """
+
+    def __init__(self, path, pragmas, persistent, seconds):
+        self.path = path
+        self.pragmas = pragmas
+        self.persistent = persistent
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.counts = {'reads': 0, 'writes': 0, 'errors': 0}
+
+    def connect(self):
+        connection = sqlite3.connect(
+            self.path, timeout=DEFAULT_TIMEOUT, isolation_level=None,
+            check_same_thread=False)
+        apply_sqlite_pragmas(connection.cursor(), self.pragmas)
+        return connection
+
+    def read(self, connection, rng):
+        connection.execute(
+            'SELECT id, text FROM post WHERE author_id = ? '
+            'ORDER BY pub_date DESC LIMIT ?',
+            (rng.randrange(AUTHORS), READ_LIMIT)
+        ).fetchall()
+
+    def write(self, connection, rng):
+        connection.execute('BEGIN IMMEDIATE')
+        connection.execute(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            (rng.randrange(AUTHORS), 'benchmark', perf_counter()))
+        connection.execute('COMMIT')
+
+    def worker(self, operation, key, seed):
+        rng = random.Random(seed)
+        connection = self.connect() if self.persistent else None
+        done = errors = 0
+        deadline = perf_counter() + self.seconds
+        while perf_counter() < deadline:
+            current = connection or self.connect()
+            try:
+                operation(current, rng)
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+                if current.in_transaction:
+                    current.execute('ROLLBACK')
+            finally:
+                if connection is None:
+                    current.close()
+        if connection is not None:
+            connection.close()
+        with self.lock:
+            self.counts[key] += done
+            self.counts['errors'] += errors
+
+    def run(self, readers, writers):
+        threads = [
+            threading.Thread(target=self.worker, args=(self.read, 'reads', i))
+            for i in range(readers)
+        ] + [
+            threading.Thread(
+                target=self.worker, args=(self.write, 'writes', -i - 1))
+            for i in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            key: value / self.seconds if key != 'errors' else value
+            for key, value in self.counts.items()
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при параллельных '
+        'чтениях и записях: настройки по умолчанию и «боевой» профиль'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        profiles = {
+            'default': ({}, False),
+            'production': (settings.SQLITE_PRAGMAS, True),
+        }
+        results = {}
+        for name, (pragmas, persistent) in profiles.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.prepare(path, pragmas, options['rows'])
+                results[name] = Workload(
+                    path, pragmas, persistent, options['seconds']
+                ).run(options['readers'], options['writers'])
+            self.stdout.write(
+                '{:<12} чтений/с={reads:10.1f} записей/с={writes:9.1f} '
+                'ошибок={errors}'.format(name, **results[name]))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'options': {
+                        key: options[key]
+                        for key in ('readers', 'writers', 'seconds', 'rows')
+                    },
+                    'pragmas': settings.SQLITE_PRAGMAS,
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+
+    def prepare(self, path, pragmas, rows):
+        connection = sqlite3.connect(path, isolation_level=None)
+        apply_sqlite_pragmas(connection.cursor(), pragmas)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        rng = random.Random(0)
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            ((rng.randrange(AUTHORS), 'text ' * 20, i) for i in range(rows))
+        )
+        connection.execute('COMMIT')
+        connection.close()
@@ -0,0 +1,189 @@
+import json
+import platform
+from datetime import datetime, timezone
+from statistics import mean
+from time import perf_counter
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+BENCHMARK_NAMESPACES = ('posts', 'users')
+# GET на эти адреса меняет состояние: разлогинивает или меняет подписки
+UNSAFE_URL_NAMES = (
+    'users:logout', 'posts:profile_follow', 'posts:profile_unfollow'
+)
+ANONYMOUS = 'anonymous'
+AUTHENTICATED = 'authenticated'
+# допустимый рост p50/p99 относительно базового прогона, проценты
+DEFAULT_THRESHOLD = 20
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга"""
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def iter_patterns(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_patterns(
+                pattern.url_patterns, pattern.namespace or namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield namespace, pattern
+
+
+def benchmark_urls():
+    """Имена и аргументы всех маршрутов BENCHMARK_NAMESPACES"""
+    for namespace, pattern in iter_patterns(get_resolver().url_patterns):
+        if namespace in BENCHMARK_NAMESPACES:
+            yield (
+                f'{namespace}:{pattern.name}',
+                tuple(pattern.pattern.converters)
+            )
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность и задержки p50/p99 '
+        'для всех адресов posts и users, результат пишет в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument(
+            '--compare', help='Файл с прошлыми результатами для сравнения')
+        parser.add_argument(
+            '--threshold', type=float, default=DEFAULT_THRESHOLD,
+            help='Допустимый рост задержки в процентах')
+        parser.add_argument(
+            '--include-unsafe', action='store_true',
+            help='Замерять и адреса, меняющие состояние')
+
+    def handle(self, *args, **options):
+        author = self.sample_author()
+        if author is None:
+            raise CommandError(
+                'Нет постов: заполните БД командой generate_dataset')
+        reader = self.sample_reader(author)
+        url_kwargs = self.sample_kwargs(author, reader)
+        clients = {ANONYMOUS: Client(), AUTHENTICATED: Client()}
+        clients[AUTHENTICATED].force_login(reader)
+        results = {}
+        for name, arguments in benchmark_urls():
+            if name in UNSAFE_URL_NAMES and not options['include_unsafe']:
+                continue
+            url = reverse(
+                name, kwargs={key: url_kwargs[key] for key in arguments})
+            for mode, client in clients.items():
+                key = f'{name} [{mode}]'
+                results[key] = self.measure(client, url, options)
+                self.stdout.write(
+                    '{:<55} p50={p50_ms:8.2f}ms p99={p99_ms:8.2f}ms '
+                    '{rps:8.1f} rps'.format(key, **results[key]))
+                if mode == AUTHENTICATED and name == 'users:logout':
+                    client.force_login(reader)
+        report = {'meta': self.meta(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(results, options['compare'], options['threshold'])
+
+    def sample_author(self):
+        """Самый плодовитый автор: на его страницах больше всего данных"""
+        return User.objects.filter(
+            stats__isnull=False).order_by('-stats__posts_count').first() or (
+            User.objects.filter(posts__isnull=False).first())
+
+    def sample_reader(self, author):
+        """Читатель с самым большим числом подписок"""
+        follow = Follow.objects.order_by('-user__stats__following_count') \
+            .select_related('user').first()
+        return follow.user if follow else author
+
+    def sample_kwargs(self, author, reader):
+        post = Post.objects.filter(author=author).order_by(
+            '-comments_count', '-id').first()
+        group = Group.objects.filter(posts__isnull=False).first() or (
+            Group.objects.first())
+        return {
+            'username': author.username,
+            'post_id': post.pk,
+            'slug': group.slug if group else 'missing',
+            'uidb64': urlsafe_base64_encode(force_bytes(reader.pk)),
+            'token': default_token_generator.make_token(reader),
+        }
+
+    def measure(self, client, url, options):
+        for _ in range(options['warmup']):
+            client.get(url)
+        timings = []
+        statuses = set()
+        started = perf_counter()
+        for _ in range(options['requests']):
+            start = perf_counter()
+            response = client.get(url)
+            timings.append(perf_counter() - start)
+            statuses.add(response.status_code)
+        elapsed = perf_counter() - started
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'requests': len(timings),
+            'mean_ms': mean(timings) * 1000,
+            'p50_ms': percentile(timings, 50) * 1000,
+            'p99_ms': percentile(timings, 99) * 1000,
+            'rps': len(timings) / elapsed if elapsed else 0,
+        }
+
+    def meta(self, options):
+        return {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'dataset': {
+                'users': User.objects.count(),
+                'posts': Post.objects.count(),
+                'groups': Group.objects.count(),
+                'follows': Follow.objects.count(),
+            },
+        }
+
+    def compare(self, results, path, threshold):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = []
+        for key, current in results.items():
+            previous = baseline.get(key)
+            if previous is None:
+                continue
+            for metric in ('p50_ms', 'p99_ms'):
+                limit = previous[metric] * (1 + threshold / 100)
+                if current[metric] > limit:
+                    regressions.append(
+                        f'{key}: {metric} {previous[metric]:.2f} -> '
+                        f'{current[metric]:.2f}')
+        if regressions:
+            raise CommandError(
+                'Регрессия производительности:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
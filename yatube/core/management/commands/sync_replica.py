@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную БД SQLite в файлы реплик: локальная замена '
+        'репликации для проверки ReplicaRouter'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_REPLICA_DB')
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        source = sqlite3.connect(primary)
+        try:
+            for alias in settings.REPLICA_DATABASES:
+                connections[alias].close()
+                target = sqlite3.connect(
+                    connections[alias].settings_dict['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{alias}: скопирована {primary}')
+        finally:
+            source.close()
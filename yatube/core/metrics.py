@@ -0,0 +1,149 @@
+import threading
+from collections import defaultdict
+from time import perf_counter
+
+# границы корзин гистограммы длительности запроса, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+UNRESOLVED_VIEW = '<unresolved>'
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Счётчики одного запроса: SQL и рендер шаблонов"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+
+def start_request():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def finish_request():
+    _local.stats = None
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+class QueryTimer:
+    """Обёртка для connection.execute_wrapper: считает запросы и время"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.stats.queries += 1
+            self.stats.sql_time += perf_counter() - start
+
+
+def record_template_time(seconds):
+    stats = current_stats()
+    if stats is not None:
+        stats.template_time += seconds
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.latency = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class MetricsRegistry:
+    """Накопленные метрики запросов по именам view в этом процессе"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewMetrics)
+
+    def record(self, view_name, stats, latency):
+        with self._lock:
+            metrics = self._views[view_name]
+            metrics.requests += 1
+            metrics.queries += stats.queries
+            metrics.sql_time += stats.sql_time
+            metrics.template_time += stats.template_time
+            metrics.latency += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    metrics.buckets[i] += 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: vars(metrics).copy()
+                for name, metrics in self._views.items()
+            }
+
+    def render_prometheus(self, extra=()):
+        """Метрики в текстовом формате Prometheus.
+
+        extra - дополнительные строки (name, labels, value, type, help).
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name, metric_type, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for suffix, labels, value in samples:
+                label_text = ','.join(
+                    f'{key}="{escape_label(val)}"' for key, val in labels)
+                lines.append(f'{name}{suffix}{{{label_text}}} {value}')
+
+        views = sorted(snapshot.items())
+        family(
+            'yatube_requests_total', 'counter', 'Запросов по view',
+            [('', [('view', name)], m['requests']) for name, m in views])
+        family(
+            'yatube_sql_queries_total', 'counter', 'SQL-запросов по view',
+            [('', [('view', name)], m['queries']) for name, m in views])
+        family(
+            'yatube_sql_seconds_total', 'counter',
+            'Время выполнения SQL по view',
+            [('', [('view', name)], m['sql_time']) for name, m in views])
+        family(
+            'yatube_template_seconds_total', 'counter',
+            'Время рендера шаблонов по view',
+            [('', [('view', name)], m['template_time'])
+             for name, m in views])
+        latency = []
+        for name, m in views:
+            for bound, count in zip(LATENCY_BUCKETS, m['buckets']):
+                latency.append(
+                    ('_bucket', [('view', name), ('le', bound)], count))
+            latency.append(
+                ('_bucket', [('view', name), ('le', '+Inf')], m['requests']))
+            latency.append(('_sum', [('view', name)], m['latency']))
+            latency.append(('_count', [('view', name)], m['requests']))
+        family(
+            'yatube_request_duration_seconds', 'histogram',
+            'Полное время обработки запроса по view', latency)
+        for name, metric_type, help_text, samples in extra:
+            family(name, metric_type, help_text, samples)
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+registry = MetricsRegistry()
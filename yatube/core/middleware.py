@@ -0,0 +1,98 @@
+import logging
+import time
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from . import replicas
+from .metrics import (
+    UNRESOLVED_VIEW,
+    QueryTimer,
+    finish_request,
+    registry,
+    start_request,
+)
+
+logger = logging.getLogger('yatube.metrics')
+
+# пороги по умолчанию, после которых запрос попадает в лог
+SLOW_REQUEST_MS = 500
+MAX_REQUEST_QUERIES = 50
+
+
+class RequestMetricsMiddleware:
+    """Считает SQL-запросы, время SQL, рендера шаблонов и ответа
+    для каждого view и пишет в лог запросы, превысившие пороги
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(
+            settings, 'METRICS_SLOW_REQUEST_MS', SLOW_REQUEST_MS)
+        self.max_queries = getattr(
+            settings, 'METRICS_MAX_REQUEST_QUERIES', MAX_REQUEST_QUERIES)
+
+    def __call__(self, request):
+        stats = start_request()
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(QueryTimer(stats)))
+                response = self.get_response(request)
+        finally:
+            finish_request()
+        latency = perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED_VIEW
+        registry.record(view_name, stats, latency)
+        if latency * 1000 > self.slow_ms or stats.queries > self.max_queries:
+            logger.warning(
+                '%s %s view=%s status=%s time=%.1fms queries=%d sql=%.1fms '
+                'templates=%.1fms',
+                request.method, request.path, view_name,
+                response.status_code, latency * 1000, stats.queries,
+                stats.sql_time * 1000, stats.template_time * 1000
+            )
+        return response
+
+
+class ReplicaMiddleware:
+    """Закрепляет чтения пользователя за основной БД после его записи.
+
+    Если запрос что-то записал, ставит cookie на STICKY_SECONDS: редирект
+    после post_create, add_comment и т.п. и следующие страницы читаются
+    из основной БД, пока реплики догоняют её.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(
+            settings, 'REPLICA_STICKY_SECONDS', replicas.STICKY_SECONDS)
+
+    def is_pinned(self, request):
+        try:
+            until = float(request.COOKIES.get(
+                replicas.STICKY_COOKIE_NAME, 0))
+        except ValueError:
+            return False
+        return until > time.time()
+
+    def __call__(self, request):
+        replicas.start_request(pinned=self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+            if replicas.wrote():
+                response.set_cookie(
+                    replicas.STICKY_COOKIE_NAME,
+                    str(time.time() + self.sticky_seconds),
+                    max_age=self.sticky_seconds,
+                    httponly=True,
+                    samesite='Lax'
+                )
+        finally:
+            replicas.finish_request()
+        return response
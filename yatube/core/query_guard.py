@@ -0,0 +1,71 @@
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryRecorder:
+    """Записывает SQL-запросы ко всем БД внутри блока with.
+
+    В отличие от CaptureQueriesContext работает и при DEBUG=False,
+    поэтому годится для тестов.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = []
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def report(self):
+        return '\n'.join(
+            f'{number}. {sql}'
+            for number, sql in enumerate(self.queries, start=1)
+        )
+
+
+@contextmanager
+def assert_max_queries(budget, label=''):
+    """Падает, если внутри блока выполнено больше budget запросов"""
+    with QueryRecorder() as recorder:
+        yield recorder
+    if len(recorder) > budget:
+        raise AssertionError(
+            f'{label}: {len(recorder)} SQL-запросов при бюджете {budget}\n'
+            f'{recorder.report()}'
+        )
+
+
+def assert_queries_do_not_scale(request, grow, label=''):
+    """Проверяет, что число запросов не растёт вместе с размером страницы.
+
+    request - выполняет запрос к view, grow - добавляет объекты
+    на страницу. Первый запрос прогревает ленивые данные (счётчики,
+    сессию) и не учитывается. Возвращает число запросов после роста.
+    """
+    request()
+    with QueryRecorder() as before:
+        request()
+    grow()
+    with QueryRecorder() as after:
+        request()
+    if len(after) != len(before):
+        raise AssertionError(
+            f'{label}: число SQL-запросов зависит от размера страницы '
+            f'({len(before)} -> {len(after)})\n{after.report()}'
+        )
+    return len(after)
@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# cookie, пока действует которая, чтения пользователя идут в основную БД
+STICKY_COOKIE_NAME = 'primary_until'
+# сколько секунд после записи читать из основной БД
+STICKY_SECONDS = 5
+# за сколько секунд реплика гарантированно догоняет основную БД
+REPLICA_MAX_LAG = 5
+
+_state = threading.local()
+
+
+def start_request(pinned=False):
+    _state.read_only = False
+    _state.pinned = pinned
+    _state.wrote = False
+    _state.used_replica = False
+
+
+def finish_request():
+    _state.__dict__.clear()
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def used_replica():
+    return getattr(_state, 'used_replica', False)
+
+
+def may_lag(changed_at):
+    """Реплика могла ещё не получить изменение, сделанное в changed_at"""
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG', REPLICA_MAX_LAG)
+    return changed_at > time.time() - max_lag
+
+
+def read_only_view(view):
+    """Помечает view только для чтения: его запросы можно отдать реплике"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        previous = getattr(_state, 'read_only', False)
+        _state.read_only = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.read_only = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтения read_only_view - в реплики, всё остальное - в основную БД.
+
+    После записи в рамках запроса и в течение STICKY_SECONDS после неё
+    (см. ReplicaMiddleware) чтения тоже идут в основную БД, чтобы
+    пользователь видел свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'REPLICA_DATABASES', ())
+        if (
+            replicas
+            and getattr(_state, 'read_only', False)
+            # вне запроса (команды, воркер) состояния нет
+            and not getattr(_state, 'pinned', False)
+            and not wrote()
+        ):
+            _state.used_replica = True
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # в репликах те же данные, что и в основной БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
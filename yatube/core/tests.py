@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+
+from core import replicas
+from core.caches import check_shared_caches
+from core.db import apply_sqlite_pragmas, configure_sqlite
+from core.metrics import registry
+from posts.models import Post
+
+User = get_user_model()
+
+INDEX_URL = '/'
+METRICS_URL = '/metrics/'
+INDEX_VIEW_NAME = 'posts:main'
+
+
+class SharedCacheCheckTests(TestCase):
+    def test_local_caches_reported(self):
+        """check --deploy предупреждает о кэше, своём у каждого процесса"""
+        warnings = check_shared_caches(None)
+        self.assertEqual(
+            {warning.id for warning in warnings}, {'core.W001'})
+        with tempfile.TemporaryDirectory() as location:
+            shared = {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }
+            with override_settings(CACHES={'default': shared}):
+                self.assertEqual(check_shared_caches(None), [])
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+
+    def setUp(self):
+        registry.reset()
+        cache.clear()
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_request_is_recorded_per_view(self):
+        """Запрос учитывается под именем своего view"""
+        Client().get(INDEX_URL)
+        metrics = registry.snapshot()[INDEX_VIEW_NAME]
+        self.assertEqual(metrics['requests'], 1)
+        self.assertGreater(metrics['queries'], 0)
+        self.assertGreater(metrics['template_time'], 0)
+        self.assertGreaterEqual(metrics['latency'], metrics['sql_time'])
+
+    def test_metrics_endpoint(self):
+        """Метрики в формате Prometheus доступны только персоналу"""
+        Client().get(INDEX_URL)
+        response = Client().get(METRICS_URL)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.admin_client.get(METRICS_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        body = response.content.decode()
+        self.assertIn(
+            f'yatube_requests_total{{view="{INDEX_VIEW_NAME}"}} 1', body)
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', body)
+        self.assertIn('yatube_page_cache_total{result="miss"}', body)
+        self.assertIn('# TYPE yatube_jobs_queued gauge', body)
+        self.assertIn('# TYPE yatube_thumbnail_kvstore_total counter', body)
+
+    @override_settings(METRICS_MAX_REQUEST_QUERIES=0)
+    def test_slow_request_is_logged(self):
+        """Запрос сверх порога пишется в лог"""
+        with self.assertLogs('yatube.metrics', level='WARNING') as logs:
+            Client().get(INDEX_URL)
+        self.assertIn(f'view={INDEX_VIEW_NAME}', logs.output[0])
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_benchmark_writes_and_compares_results(self):
+        """Бенчмарк пишет JSON и сравнивает его с прошлым прогоном"""
+        call_command(
+            'generate_dataset', stdout=StringIO(),
+            users=5, groups=1, posts=10, comments=5, follows=5)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command(
+                'benchmark_urls', stdout=StringIO(),
+                requests=2, warmup=0, output=output)
+            with open(output, encoding='utf-8') as file:
+                report = json.load(file)
+            self.assertIn('posts:main [anonymous]', report['results'])
+            self.assertNotIn('users:logout [anonymous]', report['results'])
+            for result in report['results'].values():
+                result['p50_ms'] = result['p99_ms'] = 0
+            with open(output, 'w', encoding='utf-8') as file:
+                json.dump(report, file)
+            with self.assertRaisesMessage(CommandError, 'Регрессия'):
+                call_command(
+                    'benchmark_urls', stdout=StringIO(),
+                    requests=2, warmup=0, compare=output)
+
+
+class SqliteProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(
+        SQLITE_PRODUCTION=True, SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_applied_on_connect(self):
+        """В «боевом» профиле PRAGMA выполняются при подключении"""
+        configure_sqlite(sender=None, connection=connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    @override_settings(
+        SQLITE_PRODUCTION=False, SQLITE_PRAGMAS={'busy_timeout': 4321})
+    def test_default_profile_keeps_defaults(self):
+        """Без «боевого» профиля соединение не настраивается"""
+        configure_sqlite(sender=None, connection=connection)
+        self.assertNotEqual(self.pragma('busy_timeout'), 4321)
+
+    def test_production_pragmas_enable_wal(self):
+        """Профиль переводит файл БД в режим WAL"""
+        with tempfile.TemporaryDirectory() as directory:
+            database = sqlite3.connect(os.path.join(directory, 'db.sqlite3'))
+            apply_sqlite_pragmas(database.cursor(), settings.SQLITE_PRAGMAS)
+            mode = database.execute('PRAGMA journal_mode').fetchone()[0]
+            database.close()
+        self.assertEqual(mode, 'wal')
+
+    def test_benchmark_reports_both_profiles(self):
+        """Бенчмарк сравнивает профиль по умолчанию и «боевой»"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'sqlite.json')
+            call_command(
+                'benchmark_sqlite', stdout=StringIO(), seconds=0.2,
+                rows=100, readers=1, writers=1, output=output)
+            with open(output, encoding='utf-8') as file:
+                results = json.load(file)['results']
+        self.assertEqual(set(results), {'default', 'production'})
+        self.assertGreater(results['production']['reads'], 0)
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        replicas.start_request()
+        self.addCleanup(replicas.finish_request)
+
+    def read_in_view(self):
+        view = replicas.read_only_view(
+            lambda request: self.router.db_for_read(Post))
+        return view(None)
+
+    def test_read_only_views_use_replica(self):
+        """Чтения read_only_view идут в реплику, остальные - в основную"""
+        self.assertEqual(self.read_in_view(), 'replica')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_reads_after_write_use_primary(self):
+        """После записи в том же запросе чтения идут в основную БД"""
+        self.router.db_for_write(Post)
+        self.assertEqual(self.read_in_view(), 'default')
+
+    def test_pinned_request_uses_primary(self):
+        """Закреплённый за основной БД запрос не читает из реплики"""
+        replicas.start_request(pinned=True)
+        self.assertEqual(self.read_in_view(), 'default')
+
+    def test_read_outside_request(self):
+        """Вне запроса read_only_view читает без ошибки"""
+        replicas.finish_request()
+        self.assertEqual(self.read_in_view(), 'replica')
+
+
+class ReplicaMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_write_pins_user_to_primary(self):
+        """Запись ставит cookie, закрепляющую чтения за основной БД"""
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertNotIn(replicas.STICKY_COOKIE_NAME, response.cookies)
+        response = self.authorized_client.post(
+            f'/posts/{self.post.pk}/comment/', {'text': 'Комментарий'})
+        self.assertIn(replicas.STICKY_COOKIE_NAME, response.cookies)
+        with mock.patch(
+            'core.replicas.start_request', wraps=replicas.start_request
+        ) as start_request:
+            self.authorized_client.get(f'/posts/{self.post.pk}/')
+        start_request.assert_called_once_with(pinned=True)
+
+    # реплика - та же тестовая БД: важна логика, а не отставание
+    @override_settings(REPLICA_DATABASES=['default'])
+    def test_fresh_replica_page_has_no_validators(self):
+        """Страница из реплики сразу после изменений не получает ETag"""
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = Client().get(INDEX_URL)
+        self.assertFalse(response.has_header('ETag'))
+        with override_settings(REPLICA_MAX_LAG=0):
+            cache.clear()
+            response = Client().get(INDEX_URL)
+        self.assertTrue(response.has_header('ETag'))
@@ -1,4 +1,14 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
+from sorl.thumbnail import default as thumbnail_default
+
+from jobs.queue import prometheus_metrics as jobs_metrics
+from posts.page_cache import get_stats as get_page_cache_stats
+
+from .metrics import registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
 
 
 def page_not_found(request, exception):
@@ -17,3 +27,30 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def metrics(request):
+    page_cache = (
+        'yatube_page_cache_total', 'counter',
+        'Обращения к кэшу страниц постов',
+        [
+            ('', [('result', name)], value)
+            for name, value in get_page_cache_stats().items()
+        ]
+    )
+    extra = [page_cache, *jobs_metrics()]
+    get_thumbnail_stats = getattr(thumbnail_default.kvstore, 'get_stats', None)
+    if get_thumbnail_stats is not None:
+        extra.append((
+            'yatube_thumbnail_kvstore_total', 'counter',
+            'Обращения к метаданным миниатюр: из кэша, из БД, поштучно',
+            [
+                ('', [('result', name)], value)
+                for name, value in get_thumbnail_stats().items()
+            ]
+        ))
+    return HttpResponse(
+        registry.render_prometheus(extra=extra),
+        content_type=PROMETHEUS_CONTENT_TYPE
+    )
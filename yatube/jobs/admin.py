@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    # в аргументах писем - одноразовые ссылки сброса пароля
+    exclude = ('payload',)
+    readonly_fields = ('created', 'finished', 'last_error')
+
+
+admin.site.register(Job, JobAdmin)
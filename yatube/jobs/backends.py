@@ -0,0 +1,17 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .queue import enqueue
+from .tasks import SEND_EMAIL_TASK, message_to_payload
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Не отправляет письма сам, а ставит их в очередь задач.
+
+    Отправку выполняет воркер (manage.py run_jobs) через
+    JOBS_EMAIL_BACKEND, повторяя её при ошибках SMTP.
+    """
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            enqueue(SEND_EMAIL_TASK, message=message_to_payload(message))
+        return len(email_messages)
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import purge_done, run_pending
+
+# пауза между опросами пустой очереди, секунды
+POLL_INTERVAL = 1
+# как часто удалять старые выполненные задачи, секунды
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди фоновых задач: выполняет и повторяет задачи'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить готовые задачи и выйти')
+        parser.add_argument(
+            '--sleep', type=float, default=POLL_INTERVAL,
+            help='Пауза между опросами пустой очереди, секунды')
+
+    def handle(self, *args, **options):
+        if options['burst']:
+            done = run_pending()
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+        purged_at = 0
+        try:
+            while True:
+                if time.monotonic() - purged_at > PURGE_INTERVAL:
+                    purge_done()
+                    purged_at = time.monotonic()
+                if not run_pending():
+                    # не держим соединение с БД открытым между опросами
+                    close_old_connections()
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Воркер остановлен')
@@ -0,0 +1,228 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('yatube.jobs')
+
+# попыток выполнить задачу, прежде чем пометить её невыполненной
+MAX_ATTEMPTS = 5
+# задержка перед повтором: RETRY_DELAY * 2 ** (попытка - 1), секунды
+RETRY_DELAY = 10
+# сколько задача может выполняться, прежде чем её заберёт другой воркер
+JOB_TIMEOUT = 300
+# сколько хранить выполненные задачи
+KEEP_DONE = timedelta(days=1)
+# окно, за которое считается пропускная способность
+THROUGHPUT_WINDOW = timedelta(minutes=5)
+# сколько кандидатов перебирать при захвате задачи
+CLAIM_BATCH = 10
+# длина сохраняемого текста ошибки
+ERROR_MAX_LENGTH = 5000
+# аргументы выполненной задачи
+EMPTY_PAYLOAD = '{}'
+ERROR_ABANDONED = (
+    'Воркер не завершил задачу за таймаут, попытки исчерпаны')
+
+_registry = {}
+
+
+def task(name=None):
+    """Регистрирует функцию как фоновую задачу"""
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        _registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def setting(name, default):
+    return getattr(settings, f'JOBS_{name}', default)
+
+
+def enqueue(name, delay=0, max_attempts=None, **kwargs):
+    """Ставит задачу в очередь; аргументы должны сериализоваться в JSON.
+
+    Запись создаётся в текущей транзакции, поэтому при её откате задача
+    тоже пропадает.
+    """
+    if name not in _registry:
+        raise KeyError(f'Задача {name} не зарегистрирована')
+    return Job.objects.create(
+        name=name,
+        payload=json.dumps(kwargs, ensure_ascii=False),
+        max_attempts=max_attempts or setting('MAX_ATTEMPTS', MAX_ATTEMPTS),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def abandoned_jobs(now):
+    # задачи, зависшие у упавшего воркера: таймаут захвата истёк
+    return Q(status=Job.RUNNING, locked_until__lt=now)
+
+
+def ready_jobs(now):
+    # зависшие задачи снова доступны, пока у них остались попытки
+    return Q(status=Job.QUEUED, run_at__lte=now) | (
+        abandoned_jobs(now) & Q(attempts__lt=F('max_attempts')))
+
+
+def fail_abandoned(now=None):
+    """Помечает невыполненными зависшие задачи без оставшихся попыток.
+
+    Иначе задача, на которой воркер падает каждый раз, навсегда
+    осталась бы в статусе «выполняется».
+    """
+    now = now or timezone.now()
+    failed = Job.objects.filter(
+        abandoned_jobs(now), attempts__gte=F('max_attempts')
+    ).update(
+        status=Job.FAILED, finished=now, locked_until=None,
+        last_error=ERROR_ABANDONED)
+    if failed:
+        logger.error('Зависших задач помечено невыполненными: %s', failed)
+    return failed
+
+
+def claim():
+    """Забирает ближайшую готовую задачу.
+
+    Захват - условный UPDATE: если задачу первым забрал другой воркер,
+    он изменит 0 строк, и берётся следующий кандидат. Тот же UPDATE
+    увеличивает attempts, так что попытка засчитывается, даже если
+    воркер упадёт, а номер попытки служит меткой захвата для run_job.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(ready_jobs(now)).order_by(
+        'run_at', 'id').values_list('pk', flat=True)[:CLAIM_BATCH]
+    timeout = timedelta(seconds=setting('TIMEOUT', JOB_TIMEOUT))
+    for pk in list(candidates):
+        claimed = Job.objects.filter(ready_jobs(now), pk=pk).update(
+            status=Job.RUNNING, locked_until=now + timeout,
+            attempts=F('attempts') + 1)
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def retry_delay(attempt):
+    return setting('RETRY_DELAY', RETRY_DELAY) * 2 ** (attempt - 1)
+
+
+def run_job(job):
+    """Выполняет задачу; при ошибке откладывает повтор или сдаётся.
+
+    Результат записывается, только если задачу с тех пор не забрал
+    заново другой воркер (после JOB_TIMEOUT): иначе его запись
+    перетёрла бы чужой захват.
+    """
+    try:
+        get_task(job.name)(**json.loads(job.payload))
+    except Exception:
+        job.last_error = traceback.format_exc()[-ERROR_MAX_LENGTH:]
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            job.finished = timezone.now()
+            logger.error('Задача %s не выполнена: %s', job, job.last_error)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts))
+            logger.warning(
+                'Задача %s упала, повтор в %s', job, job.run_at)
+    else:
+        job.status = Job.DONE
+        job.finished = timezone.now()
+        # аргументы выполненной задачи не нужны, а в них бывают секреты
+        # (ссылка сброса пароля в письме)
+        job.payload = EMPTY_PAYLOAD
+    job.locked_until = None
+    fields = (
+        'status', 'run_at', 'finished', 'locked_until', 'last_error',
+        'payload',
+    )
+    if not Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+    ).update(**{field: getattr(job, field) for field in fields}):
+        logger.warning('Задачу %s уже забрал другой воркер', job)
+    return job
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи, пока они есть; возвращает их число"""
+    fail_abandoned()
+    done = 0
+    while limit is None or done < limit:
+        job = claim()
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+def purge_done(now=None):
+    now = now or timezone.now()
+    return Job.objects.filter(
+        status=Job.DONE, finished__lt=now - KEEP_DONE).delete()[0]
+
+
+def get_stats(now=None):
+    """Глубина очереди по задачам и число завершённых за окно"""
+    now = now or timezone.now()
+    depth = {
+        (row['name'], row['status']): row['count']
+        for row in Job.objects.filter(
+            status__in=(Job.QUEUED, Job.RUNNING)
+        ).order_by().values('name', 'status').annotate(count=Count('id'))
+    }
+    finished = {
+        (row['name'], row['status']): row['count']
+        for row in Job.objects.filter(
+            status__in=(Job.DONE, Job.FAILED),
+            finished__gte=now - THROUGHPUT_WINDOW,
+        ).order_by().values('name', 'status').annotate(count=Count('id'))
+    }
+    return {
+        'depth': depth,
+        'finished': finished,
+        'window': THROUGHPUT_WINDOW.total_seconds(),
+    }
+
+
+def prometheus_metrics():
+    """Метрики очереди для core.views.metrics"""
+    stats = get_stats()
+    window = stats['window']
+    return [
+        (
+            'yatube_jobs_queued', 'gauge',
+            'Задач в очереди и в работе',
+            [
+                ('', [('task', name), ('status', status)], count)
+                for (name, status), count in sorted(stats['depth'].items())
+            ]
+        ),
+        (
+            'yatube_jobs_finished_per_second', 'gauge',
+            f'Завершённых задач в секунду за последние {window:.0f} с',
+            [
+                (
+                    '', [('task', name), ('status', status)],
+                    f'{count / window:.4f}'
+                )
+                for (name, status), count in sorted(
+                    stats['finished'].items())
+            ]
+        ),
+    ]
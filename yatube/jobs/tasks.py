@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.mail import (
+    EmailMessage,
+    EmailMultiAlternatives,
+    get_connection,
+)
+
+from .queue import task
+
+SEND_EMAIL_TASK = 'jobs.send_email'
+# бэкенд, которым воркер на самом деле отправляет письма
+DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+MESSAGE_FIELDS = (
+    'subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+)
+
+
+def message_to_payload(message):
+    """Письмо в виде, пригодном для JSON; вложения не поддерживаются"""
+    if message.attachments:
+        raise ValueError('Письма с вложениями в очередь не ставятся')
+    return {
+        **{field: getattr(message, field) for field in MESSAGE_FIELDS},
+        'headers': message.extra_headers,
+        'alternatives': list(getattr(message, 'alternatives', [])),
+    }
+
+
+def payload_to_message(payload):
+    alternatives = payload.get('alternatives')
+    message_class = EmailMultiAlternatives if alternatives else EmailMessage
+    message = message_class(
+        **{field: payload[field] for field in MESSAGE_FIELDS},
+        headers=payload['headers'],
+    )
+    for content, mimetype in alternatives or ():
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+@task(SEND_EMAIL_TASK)
+def send_email(message):
+    backend = getattr(settings, 'JOBS_EMAIL_BACKEND', DELIVERY_BACKEND)
+    get_connection(backend, fail_silently=False).send_messages(
+        [payload_to_message(message)])
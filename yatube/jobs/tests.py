@@ -0,0 +1,176 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users.const import PASSWORD_RESET_URL_NAME
+from .models import Job
+from .queue import (
+    EMPTY_PAYLOAD,
+    ERROR_ABANDONED,
+    claim,
+    enqueue,
+    prometheus_metrics,
+    run_job,
+    run_pending,
+    task,
+)
+from .tasks import SEND_EMAIL_TASK
+
+User = get_user_model()
+
+FLAKY_TASK = 'jobs.tests.flaky'
+LOCMEM_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+calls = []
+
+
+@task(FLAKY_TASK)
+def flaky(fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise ConnectionError('SMTP недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='jobs.backends.QueuedEmailBackend',
+    JOBS_EMAIL_BACKEND=LOCMEM_BACKEND,
+    JOBS_MAX_ATTEMPTS=3,
+)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_password_reset_email_is_queued(self):
+        """Письмо сброса пароля отправляет воркер, а не запрос"""
+        User.objects.create_user(
+            username='test_user', email='u@test.com', password='l7dccBopg')
+        Client().post(
+            reverse(PASSWORD_RESET_URL_NAME), {'email': 'u@test.com'})
+        self.assertEqual(mail.outbox, [])
+        job = Job.objects.get()
+        self.assertEqual(job.name, SEND_EMAIL_TASK)
+        call_command('run_jobs', '--burst', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['u@test.com'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        # ссылка сброса пароля не хранится после отправки
+        self.assertEqual(job.payload, EMPTY_PAYLOAD)
+
+    def test_admin_hides_payload(self):
+        """Админка не показывает аргументы задач"""
+        admin = User.objects.create_superuser(
+            username='admin', email='a@test.com', password='l7dccBopg')
+        client = Client()
+        client.force_login(admin)
+        job = enqueue(FLAKY_TASK, fail_times=0)
+        response = client.get(
+            reverse('admin:jobs_job_change', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('payload', response.context['adminform'].form.fields)
+
+    def test_html_alternatives_survive_queue(self):
+        """HTML-версия письма доходит до получателя"""
+        mail.send_mail(
+            'Тема', 'Текст', 'from@test.com', ['to@test.com'],
+            html_message='<p>Текст</p>')
+        run_pending()
+        self.assertEqual(
+            mail.outbox[0].alternatives, [('<p>Текст</p>', 'text/html')])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Упавшая задача откладывается и повторяется до max_attempts"""
+        job = enqueue(FLAKY_TASK, fail_times=1)
+        with self.assertLogs('yatube.jobs', level='WARNING'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('SMTP недоступен', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        # до истечения задержки задача не выполняется
+        self.assertEqual(run_pending(), 0)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 2)
+
+    def test_job_fails_after_max_attempts(self):
+        job = enqueue(FLAKY_TASK, fail_times=10)
+        with self.assertLogs('yatube.jobs', level='WARNING') as logs:
+            for _ in range(3):
+                Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+                run_pending()
+        self.assertEqual(logs.records[-1].levelname, 'ERROR')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(len(calls), 3)
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        """Занятую задачу не берёт второй воркер, пока не истёк таймаут"""
+        job = enqueue(FLAKY_TASK, fail_times=0)
+        self.assertEqual(claim().pk, job.pk)
+        self.assertIsNone(claim())
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        run_job(claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_reclaimed_job_keeps_new_claim(self):
+        """Воркер, у которого задачу забрали по таймауту, не затирает
+        новый захват
+        """
+        job = enqueue(FLAKY_TASK, fail_times=0)
+        stale = claim()
+        self.assertEqual(stale.attempts, 1)
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        fresh = claim()
+        self.assertEqual(fresh.attempts, 2)
+        with self.assertLogs('yatube.jobs', level='WARNING'):
+            run_job(stale)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.locked_until, fresh.locked_until)
+        run_job(fresh)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_abandoned_job_fails_after_max_attempts(self):
+        """Задача, воркер которой каждый раз падает, не захватывается
+        больше max_attempts раз
+        """
+        job = enqueue(FLAKY_TASK, max_attempts=2, fail_times=0)
+        expired = timezone.now() - timedelta(seconds=1)
+        for attempt in (1, 2):
+            self.assertEqual(claim().attempts, attempt)
+            # воркер упал, не записав результат
+            Job.objects.filter(pk=job.pk).update(locked_until=expired)
+        self.assertIsNone(claim())
+        with self.assertLogs('yatube.jobs', level='ERROR'):
+            self.assertEqual(run_pending(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(job.last_error, ERROR_ABANDONED)
+        self.assertEqual(calls, [])
+
+    def test_metrics(self):
+        """Метрики показывают глубину очереди и завершённые задачи"""
+        enqueue(FLAKY_TASK, fail_times=0)
+        enqueue(FLAKY_TASK, fail_times=0)
+        queued, finished = prometheus_metrics()
+        self.assertEqual(
+            queued[3], [('', [('task', FLAKY_TASK), ('status', 'queued')], 2)])
+        run_pending()
+        queued, finished = prometheus_metrics()
+        self.assertEqual(queued[3], [])
+        self.assertEqual(len(finished[3]), 1)
+        self.assertEqual(finished[3][0][1][1], ('status', 'done'))
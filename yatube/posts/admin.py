@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db.models.expressions import RawSQL
+from .search import fts_available, matching_ids_sql, to_match_query
 from .models import (
     Post,
     Group,
@@ -20,6 +22,14 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE '%...%'"""
+        if not fts_available() or not to_match_query(search_term):
+            return super().get_search_results(
+                request, queryset, search_term)
+        sql, params = matching_ids_sql(search_term)
+        return queryset.filter(pk__in=RawSQL(sql, params)), False
+
 
 admin.site.register(Post, PostAdmin)
 
@@ -1,6 +1,29 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_migrate
+
+
+def restore_fts(sender, using, **kwargs):
+    """Возвращает триггеры полнотекстового индекса, если их потеряла
+    миграция, пересоздавшая таблицу posts_post
+    """
+    from django.db import connections
+    from .search import FTS_TABLE, fts_available, install_fts
+    connection = connections[using]
+    if not fts_available(connection):
+        return
+    if FTS_TABLE in connection.introspection.table_names():
+        install_fts(connection)
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'Посты'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .kvstore import clear_prefetched
+        post_migrate.connect(restore_fts, sender=self)
+        # предзагруженные миниатюры живут не дольше запроса
+        request_started.connect(clear_prefetched)
+        request_finished.connect(clear_prefetched)
@@ -1,19 +1,26 @@
 # templates
 INDEX_TEMPLATE = 'posts/index.html'
+POPULAR_TEMPLATE = 'posts/popular.html'
 PROFILE_TEMPLATE = 'posts/profile.html'
 POST_DETAIL_TEMPLATE = 'posts/post_detail.html'
 POST_CREATE_TEMPLATE = 'posts/create_post.html'
 GROUP_LIST_TEMPLATE = 'posts/group_list.html'
 FOLLOW_INDEX_TEMPLATE = 'posts/follow.html'
+SEARCH_TEMPLATE = 'posts/search.html'
+COMMENT_LIST_TEMPLATE = 'posts/includes/comment_list.html'
 
 # urls names
 INDEX_URL_NAME = 'posts:main'
+POPULAR_URL_NAME = 'posts:popular'
 PROFILE_URL_NAME = 'posts:profile'
 POST_DETAIL_URL_NAME = 'posts:post_detail'
 POST_CREATE_URL_NAME = 'posts:post_create'
 POST_EDIT_URL_NAME = 'posts:post_edit'
+ADD_COMMENT_URL_NAME = 'posts:add_comment'
 GROUP_LIST_URL_NAME = 'posts:group_list'
 USERS_LOGIN_URL_NAME = 'users:login'
 FOLLOW_INDEX_URL_NAME = 'posts:follow_index'
 PROFILE_FOLLOW_URL_NAME = 'posts:profile_follow'
 PROFILE_UNFOLLOW_URL_NAME = 'posts:profile_unfollow'
+SEARCH_URL_NAME = 'posts:search'
+POST_COMMENTS_URL_NAME = 'posts:post_comments'
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def _count_subquery(queryset, field):
+    """Подзапрос с количеством строк queryset для OuterRef('pk')"""
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+        field).annotate(total=Count('pk')).values('total')
+    return Coalesce(
+        Subquery(counted, output_field=IntegerField()), 0)
+
+
+def recount_author_stats(user_ids=None):
+    """Пересчитывает счётчики авторов одним UPDATE на всех пользователей"""
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk) for pk in users.values_list('pk', flat=True)),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    stats = AuthorStats.objects.all()
+    if user_ids is not None:
+        stats = stats.filter(user_id__in=user_ids)
+    stats.update(
+        posts_count=_count_subquery(Post.objects, 'author'),
+        followers_count=_count_subquery(Follow.objects, 'author'),
+        following_count=_count_subquery(Follow.objects, 'user'),
+    )
+
+
+def recount_comments(post_ids=None):
+    """Пересчитывает количество комментариев у постов"""
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    posts.update(comments_count=_count_subquery(Comment.objects, 'post'))
+
+
+def change_author_stats(user_id, **deltas):
+    """Сдвигает счётчики автора, например posts_count=1.
+
+    Если счётчиков ещё нет, они будут посчитаны при первом чтении.
+    """
+    AuthorStats.objects.filter(user_id=user_id).update(
+        **{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        }
+    )
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=Greatest(F('comments_count') + delta, 0))
+
+
+def get_author_stats(user):
+    """Возвращает счётчики автора, создавая их при первом обращении"""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        recount_author_stats([user.pk])
+        return AuthorStats.objects.get(user=user)
@@ -0,0 +1,234 @@
+import io
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sites.shortcuts import get_current_site
+from django.contrib.syndication.views import Feed, add_domain
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import (
+    Atom1Feed,
+    Rss201rev2Feed,
+    SimplerXMLGenerator,
+)
+from django.utils.text import Truncator
+
+from .const import (
+    GROUP_LIST_URL_NAME,
+    INDEX_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    PROFILE_URL_NAME,
+)
+from .models import Group, Post
+
+User = get_user_model()
+
+# количество постов в ленте
+FEED_ITEMS = 30
+# количество слов текста в заголовке элемента ленты
+FEED_TITLE_WORDS = 10
+FEED_ENCODING = 'utf-8'
+
+
+class StreamingFeedMixin:
+    """Пишет XML ленты частями: шапку, каждый элемент и хвост.
+
+    Элементы не копятся в генераторе: stream() получает их итератором
+    и пишет по одному, так что в памяти лежит только текущий пост.
+    """
+
+    item_element = None
+    # дата последнего изменения ленты, раз элементов заранее нет
+    latest_date = None
+
+    def latest_post_date(self):
+        return self.latest_date or super().latest_post_date()
+
+    def write_items(self, handler):
+        # элементы пишет stream(), здесь только запоминаем их место
+        self._items_offset = len(self._outfile.getvalue())
+
+    def stream(self, items, encoding=FEED_ENCODING):
+        """items - итератор словарей аргументов add_item()"""
+        self._outfile = io.StringIO()
+        self.write(self._outfile, encoding)
+        document = self._outfile.getvalue()
+        yield document[:self._items_offset]
+        for kwargs in items:
+            # add_item приводит аргументы к виду, который ждёт генератор
+            self.add_item(**kwargs)
+            item = self.items.pop()
+            chunk = io.StringIO()
+            handler = SimplerXMLGenerator(chunk, encoding)
+            handler.startElement(
+                self.item_element, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_element)
+            yield chunk.getvalue()
+        yield document[self._items_offset:]
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    item_element = 'entry'
+
+
+class PostsFeed(Feed):
+    """Лента последних постов, отдаваемая потоком.
+
+    Feed.get_feed() в Django собирает все элементы до ответа, поэтому
+    здесь он строит только шапку, а посты читаются из items()
+    через iterator() уже внутри потока ответа.
+    """
+
+    feed_type = StreamingRssFeed
+
+    def __call__(self, request, *args, **kwargs):
+        try:
+            obj = self.get_object(request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            raise Http404('Feed object does not exist.')
+        feedgen = self.get_feed(obj, request)
+        items = self._get_dynamic_attr('items', obj)
+        feedgen.latest_date = max(
+            items.values_list('updated', flat=True), default=None)
+        site = get_current_site(request)
+        return StreamingHttpResponse(
+            feedgen.stream(
+                self.item_kwargs(item, site, request)
+                for item in items.iterator()
+            ),
+            content_type=feedgen.content_type
+        )
+
+    def get_feed(self, obj, request):
+        """Генератор ленты без элементов"""
+        site = get_current_site(request)
+        return self.feed_type(
+            title=self._get_dynamic_attr('title', obj),
+            subtitle=self._get_dynamic_attr('subtitle', obj),
+            link=add_domain(
+                site.domain, self._get_dynamic_attr('link', obj),
+                request.is_secure()),
+            description=self._get_dynamic_attr('description', obj),
+            language=settings.LANGUAGE_CODE,
+            feed_url=add_domain(
+                site.domain,
+                self._get_dynamic_attr('feed_url', obj) or request.path,
+                request.is_secure()),
+            ttl=self._get_dynamic_attr('ttl', obj),
+            **self.feed_extra_kwargs(obj)
+        )
+
+    def item_kwargs(self, item, site, request):
+        """Аргументы add_item() для поста, как в Feed.get_feed()"""
+        link = add_domain(
+            site.domain, self.item_link(item), request.is_secure())
+        return {
+            'title': self.item_title(item),
+            'link': link,
+            'description': self.item_description(item),
+            'unique_id': link,
+            'pubdate': self.item_pubdate(item),
+            'updateddate': self.item_updateddate(item),
+            'author_name': self.item_author_name(item),
+            'categories': self.item_categories(item),
+            **self.item_extra_kwargs(item),
+        }
+
+    def posts(self):
+        return Post.objects.select_related('author', 'group').only(
+            'id', 'text', 'pub_date', 'updated', 'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__title', 'group__slug',
+        ).order_by('-pub_date', '-id')
+
+    def item_title(self, item):
+        return Truncator(item.text).words(FEED_TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse(POST_DETAIL_URL_NAME, args=[item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse(INDEX_URL_NAME)
+
+    def items(self):
+        return self.posts()[:FEED_ITEMS]
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse(GROUP_LIST_URL_NAME, args=[group.slug])
+
+    def items(self, group):
+        return self.posts().filter(group=group)[:FEED_ITEMS]
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse(PROFILE_URL_NAME, args=[author.username])
+
+    def items(self, author):
+        return self.posts().filter(author=author)[:FEED_ITEMS]
+
+
+class IndexAtomFeed(IndexFeed):
+    feed_type = StreamingAtomFeed
+    subtitle = IndexFeed.description
+
+
+class GroupAtomFeed(GroupFeed):
+    feed_type = StreamingAtomFeed
+
+    def subtitle(self, group):
+        return group.description
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = StreamingAtomFeed
+
+    def subtitle(self, author):
+        return self.description(author)
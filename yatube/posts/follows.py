@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from core.caches import shared_timeout
+
+from .models import Follow
+
+FOLLOWING_KEY_PREFIX = 'following:'
+# сколько хранить набор подписок; при изменении он сбрасывается сигналом,
+# а с кэшем, своим у каждого процесса, живёт не дольше LOCAL_CACHE_TIMEOUT
+FOLLOWING_TIMEOUT = 60 * 60 * 24
+
+
+def following_key(user_id):
+    return f'{FOLLOWING_KEY_PREFIX}{user_id}'
+
+
+def get_following_ids(user):
+    """id авторов, на которых подписан пользователь.
+
+    Набор читается одним запросом, хранится в кэше и запоминается
+    на объекте пользователя, так что проверки подписки для любого
+    числа авторов на странице не ходят в БД.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    following_ids = getattr(user, '_following_ids', None)
+    if following_ids is None:
+        following_ids = cache.get(following_key(user.pk))
+        if following_ids is None:
+            following_ids = frozenset(Follow.objects.filter(
+                user_id=user.pk).values_list('author_id', flat=True))
+            cache.set(following_key(user.pk), following_ids,
+                      shared_timeout(FOLLOWING_TIMEOUT))
+        user._following_ids = following_ids
+    return following_ids
+
+
+def is_following(user, author):
+    return author.pk in get_following_ids(user)
+
+
+def forget_following(user_id):
+    cache.delete(following_key(user_id))
+    # и ещё раз после коммита: параллельный запрос мог успеть закэшировать
+    # набор без этой подписки
+    transaction.on_commit(lambda: cache.delete(following_key(user_id)))
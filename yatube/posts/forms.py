@@ -3,6 +3,7 @@ from .models import (
     Post,
     Comment
 )
+from .uploads import process_image, too_many_bytes_message
 
 
 class PostForm(forms.ModelForm):
@@ -13,6 +14,35 @@ class PostForm(forms.ModelForm):
             'text': {'required': 'Пост не может быть без текста'}
         }
 
+    def __init__(self, *args, oversized_uploads=(), **kwargs):
+        """oversized_uploads - поля, файлы которых отброшены
+        ImageSizeLimitHandler ещё при приёме запроса
+        """
+        super().__init__(*args, **kwargs)
+        self.oversized_uploads = oversized_uploads
+        self.image_size = None
+
+    def clean_image(self):
+        """Проверяет размеры новой картинки, снимает EXIF и уменьшает"""
+        image = self.cleaned_data.get('image')
+        if 'image' not in self.files or not image:
+            return image
+        image, *self.image_size = process_image(image)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in self.oversized_uploads:
+            if field in self.fields:
+                self.add_error(field, too_many_bytes_message())
+        return cleaned_data
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            self.instance.image_width, self.instance.image_height = (
+                self.image_size or (None, None))
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,121 @@
+import json
+import threading
+
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.caches import shared_timeout
+
+STATS_KEY_PREFIX = 'posts:thumbnail-stats:'
+# ключ найден в общем кэше при предзагрузке
+STATS_CACHED = 'cached'
+# ключ дочитан из БД при предзагрузке
+STATS_DB = 'db'
+# одиночное обращение мимо предзагрузки
+STATS_SINGLE = 'single'
+STATS_NAMES = (STATS_CACHED, STATS_DB, STATS_SINGLE)
+# записи со списком готовых вариантов картинки
+VARIANTS_IDENTITY = 'variants'
+
+_local = threading.local()
+
+
+def clear_prefetched(**kwargs):
+    _local.values = {}
+
+
+class PrefetchKVStore(KVStore):
+    """KV-хранилище sorl-thumbnail с пакетной предзагрузкой.
+
+    Кроме записей sorl хранит для каждой картинки список её готовых
+    вариантов (set_variants), так что страница узнаёт о миниатюрах без
+    вычисления их имён. prefetch_variants() читает эти записи для всей
+    страницы одним get_many из общего кэша (THUMBNAIL_CACHE: locmem,
+    memcached - любой бэкенд Django) и одним запросом к БД для
+    отсутствующих; до конца запроса они отдаются из памяти.
+
+    Промахи в кэш не пишутся: миниатюры могли создать в другом
+    процессе, и заглушка не должна закрепиться на годы.
+    """
+
+    def timeout(self):
+        return shared_timeout(
+            thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+            alias=thumbnail_settings.THUMBNAIL_CACHE
+        )
+
+    def count(self, name, delta=1):
+        if not delta:
+            return
+        key = STATS_KEY_PREFIX + name
+        if not self.cache.add(key, delta, None):
+            self.cache.incr(key, delta)
+
+    def get_stats(self):
+        keys = [STATS_KEY_PREFIX + name for name in STATS_NAMES]
+        values = self.cache.get_many(keys)
+        return {
+            name: values.get(STATS_KEY_PREFIX + name, 0)
+            for name in STATS_NAMES
+        }
+
+    def variants_key(self, source):
+        return add_prefix(source.key, VARIANTS_IDENTITY)
+
+    def get_variants(self, source):
+        value = self._get_raw(self.variants_key(source))
+        return json.loads(value) if value else None
+
+    def set_variants(self, source, variants):
+        self._set_raw(self.variants_key(source), json.dumps(variants))
+
+    def delete_variants(self, source):
+        self._delete_raw(self.variants_key(source))
+
+    def prefetch_variants(self, sources):
+        self.prefetch([self.variants_key(source) for source in sources])
+
+    def prefetch(self, keys):
+        keys = list(dict.fromkeys(keys))
+        values = {
+            key: value for key, value in self.cache.get_many(keys).items()
+            # отметка промаха, оставшаяся от стандартного хранилища sorl
+            if value != EMPTY_VALUE
+        }
+        missing = [key for key in keys if key not in values]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(
+                key__in=missing).values_list('key', 'value'))
+            if stored:
+                self.cache.set_many(stored, self.timeout())
+            values.update(stored)
+        _local.values = {key: values.get(key) for key in keys}
+        self.count(STATS_CACHED, len(keys) - len(missing))
+        self.count(STATS_DB, len(missing))
+
+    def _get_raw(self, key):
+        prefetched = getattr(_local, 'values', {})
+        if key in prefetched:
+            return prefetched[key]
+        self.count(STATS_SINGLE)
+        value = self.cache.get(key)
+        if value is None or value == EMPTY_VALUE:
+            value = KVStoreModel.objects.filter(
+                key=key).values_list('value', flat=True).first()
+            if value is not None:
+                self.cache.set(key, value, self.timeout())
+        return value
+
+    def _set_raw(self, key, value):
+        getattr(_local, 'values', {}).pop(key, None)
+        KVStoreModel.objects.update_or_create(
+            key=key, defaults={'value': value})
+        self.cache.set(key, value, self.timeout())
+
+    def _delete_raw(self, *keys):
+        prefetched = getattr(_local, 'values', {})
+        for key in keys:
+            prefetched.pop(key, None)
+        super()._delete_raw(*keys)
@@ -0,0 +1,58 @@
+import statistics
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.templatetags.cache import CacheNode
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts.const import INDEX_TEMPLATE, INDEX_URL_NAME
+from posts.models import Post
+from posts.utils import paginator
+
+
+def render_without_cache(node, context):
+    return node.nodelist.render(context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время рендера первой страницы ленты без кэша '
+        'фрагментов постов и с ним'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get(reverse(INDEX_URL_NAME))
+        request.user = AnonymousUser()
+        request.resolver_match = resolve(request.path)
+        page_obj = paginator(
+            request, Post.objects.select_related('author', 'group'))
+        context = {'page_obj': page_obj}
+        list(page_obj)
+
+        def render():
+            render_to_string(INDEX_TEMPLATE, context, request)
+
+        with mock.patch.object(CacheNode, 'render', render_without_cache):
+            before = self.measure(render, options['repeat'])
+        render()
+        after = self.measure(render, options['repeat'])
+        self.stdout.write(
+            f'постов на странице: {len(page_obj)}\n'
+            f'без кэша фрагментов: {before:.2f} мс\n'
+            f'с кэшем фрагментов: {after:.2f} мс'
+        )
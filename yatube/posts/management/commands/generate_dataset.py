@@ -0,0 +1,208 @@
+import random
+from itertools import accumulate
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts import page_cache
+from posts.counters import recount_author_stats, recount_comments
+from posts.models import Comment, Follow, Group, Post
+from posts.popularity import recount_popularity
+from posts.timeline import rebuild_feeds
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+# показатель распределения Ципфа: чем больше, тем сильнее перекос
+ZIPF_EXPONENT = 1.1
+# за сколько дней распределены даты постов
+HISTORY_DAYS = 365
+DATASET_PASSWORD = 'benchmark'
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Веса с тяжёлым хвостом: первые элементы встречаются чаще всего"""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def cumulative(weights):
+    """Накопленные веса для random.choices(cum_weights=...).
+
+    Считаются один раз: с весами choices() на каждый вызов заново
+    суммирует весь список, а с накопленными только ищет бинарным поиском.
+    """
+    return list(accumulate(weights))
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Отключает auto_now/auto_now_add, чтобы задать даты вручную"""
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def in_batches(objects, size=BATCH_SIZE):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД синтетическими пользователями, группами, постами, '
+        'комментариями и подписками с реалистичным перекосом'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.faker = Faker('ru_RU')
+        self.faker.seed_instance(options['seed'])
+        self.now = timezone.now()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            self.create_posts(options['posts'], users, groups)
+            self.create_comments(options['comments'], users)
+            self.create_follows(options['follows'], users)
+            self.stdout.write('Пересчёт счётчиков и лент...')
+            recount_author_stats()
+            recount_comments()
+            recount_popularity()
+            rebuild_feeds()
+        page_cache.bump(page_cache.GLOBAL_SCOPE)
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def random_date(self):
+        seconds = self.random.randint(0, HISTORY_DAYS * 24 * 3600)
+        return self.now - timedelta(seconds=seconds)
+
+    def create_users(self, count):
+        prefix = f'bench{self.random.randint(0, 10 ** 6)}_'
+        password = make_password(DATASET_PASSWORD)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{prefix}{i}',
+                    first_name=self.faker.first_name(),
+                    last_name=self.faker.last_name(),
+                    email=f'{prefix}{i}@example.com',
+                    password=password
+                )
+                for i in range(count)
+            ),
+            batch_size=BATCH_SIZE
+        )
+        users = list(User.objects.filter(
+            username__startswith=prefix).values_list('pk', flat=True))
+        # порядок задаёт популярность: первые - самые читаемые авторы
+        self.random.shuffle(users)
+        self.stdout.write(f'Пользователей: {len(users)}')
+        return users
+
+    def create_groups(self, count):
+        prefix = f'bench-{self.random.randint(0, 10 ** 6)}-'
+        Group.objects.bulk_create(
+            Group(
+                title=self.faker.catch_phrase()[:200],
+                slug=f'{prefix}{i}',
+                description=self.faker.paragraph()
+            )
+            for i in range(count)
+        )
+        groups = list(Group.objects.filter(
+            slug__startswith=prefix).values_list('pk', flat=True))
+        self.stdout.write(f'Групп: {len(groups)}')
+        return groups
+
+    def create_posts(self, count, users, groups):
+        author_weights = cumulative(zipf_weights(len(users)))
+        # популярные группы - в начале списка, часть постов без группы
+        group_choices = groups + [None]
+        group_weights = cumulative(zipf_weights(len(groups)) + [1.0])
+
+        def posts():
+            for _ in range(count):
+                pub_date = self.random_date()
+                yield Post(
+                    author_id=self.random.choices(
+                        users, cum_weights=author_weights)[0],
+                    group_id=self.random.choices(
+                        group_choices, cum_weights=group_weights)[0],
+                    text=self.faker.paragraph(
+                        nb_sentences=self.random.randint(1, 8)),
+                    pub_date=pub_date,
+                    updated=pub_date
+                )
+
+        fields = (
+            Post._meta.get_field('pub_date'), Post._meta.get_field('updated'))
+        with manual_dates(*fields):
+            for batch in in_batches(posts()):
+                Post.objects.bulk_create(batch)
+        self.stdout.write(f'Постов: {count}')
+
+    def create_comments(self, count, users):
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        if not post_ids:
+            return
+        # обсуждение тоже сосредоточено на немногих «вирусных» постах
+        self.random.shuffle(post_ids)
+        post_weights = cumulative(zipf_weights(len(post_ids)))
+
+        def comments():
+            for _ in range(count):
+                yield Comment(
+                    post_id=self.random.choices(
+                        post_ids, cum_weights=post_weights)[0],
+                    author_id=self.random.choice(users),
+                    text=self.faker.sentence(),
+                    created=self.random_date()
+                )
+
+        with manual_dates(Comment._meta.get_field('created')):
+            for batch in in_batches(comments()):
+                Comment.objects.bulk_create(batch)
+        self.stdout.write(f'Комментариев: {count}')
+
+    def create_follows(self, count, users):
+        # число подписчиков автора распределено по закону Ципфа
+        author_weights = cumulative(zipf_weights(len(users)))
+        pairs = set()
+        attempts = 0
+        while len(pairs) < count and attempts < count * 10:
+            attempts += 1
+            author = self.random.choices(
+                users, cum_weights=author_weights)[0]
+            user = self.random.choice(users)
+            if author != user:
+                pairs.add((user, author))
+        for batch in in_batches(
+            Follow(user_id=user, author_id=author) for user, author in pairs
+        ):
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'Подписок: {len(pairs)}')
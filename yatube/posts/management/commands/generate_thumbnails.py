@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import page_cache
+from posts.models import Post
+from posts.thumbnails import (
+    THUMBNAIL_WORKERS,
+    generate_thumbnails_in_worker,
+)
+
+# сколько картинок отдавать потокам за один раз
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=THUMBNAIL_WORKERS,
+            help='Количество параллельных потоков'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').order_by('pk')
+        last_pk = 0
+        done = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                batch = list(posts.filter(pk__gt=last_pk).values_list(
+                    'pk', 'image')[:BATCH_SIZE])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                # одинаковые загрузки хранятся одним файлом
+                names = list(dict.fromkeys(name for _, name in batch))
+                for _ in executor.map(generate_thumbnails_in_worker, names):
+                    done += 1
+        page_cache.bump(page_cache.GLOBAL_SCOPE)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано картинок: {done}'))
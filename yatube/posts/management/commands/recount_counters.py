@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_author_stats, recount_comments
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_author_stats()
+            recount_comments()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
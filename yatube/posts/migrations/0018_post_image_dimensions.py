@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:16
+
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_dimensions(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    storage = Post._meta.get_field('image').storage
+    names = Post.objects.exclude(image='').order_by().values_list(
+        'image', flat=True).distinct()
+    for name in names.iterator():
+        try:
+            with storage.open(name) as image_file:
+                # размеры из заголовка, без декодирования картинки
+                width, height = Image.open(image_file).size
+        except (OSError, ValueError):
+            # файла нет или это не картинка: размеры остаются пустыми
+            continue
+        Post.objects.filter(image=name).update(
+            image_width=width, image_height=height)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_image_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота изображения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина изображения'),
+        ),
+        migrations.RunPython(fill_dimensions, migrations.RunPython.noop),
+    ]
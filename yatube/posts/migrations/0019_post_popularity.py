@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:25
+
+import math
+
+from django.db import migrations, models
+
+# значения posts.popularity на момент миграции: код приложения
+# может измениться, а миграция должна давать тот же результат
+POPULARITY_EPOCH = 1672531200
+POPULARITY_HALF_LIFE = 24 * 3600
+POST_WEIGHT = 10
+COMMENT_WEIGHT = 10
+
+
+def initial_rank(pub_date, comments_count):
+    weight = POST_WEIGHT + COMMENT_WEIGHT * comments_count
+    return math.log2(weight) + (
+        pub_date.timestamp() - POPULARITY_EPOCH) / POPULARITY_HALF_LIFE
+
+
+def fill_popularity(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = []
+    for post in Post.objects.only('pk', 'pub_date', 'comments_count'):
+        post.popularity = initial_rank(post.pub_date, post.comments_count)
+        posts.append(post)
+    Post.objects.bulk_update(posts, ['popularity'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-popularity', '-id'], name='post_popularity_idx'),
+        ),
+        migrations.RunPython(fill_popularity, migrations.RunPython.noop),
+    ]
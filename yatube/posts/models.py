@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import post_image_storage
+
 User = get_user_model()
 
 # первые n символов из текста поста
@@ -18,6 +20,10 @@ class Post(models.Model):
         'Дата',
         auto_now_add=True,
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
@@ -36,13 +42,58 @@ class Post(models.Model):
     image = models.ImageField(
         'Изображение',
         upload_to='posts/',
+        storage=post_image_storage,
         blank=True
     )
+    # размеры оригинала, чтобы не открывать файл ради них
+    image_width = models.PositiveIntegerField(
+        'Ширина изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота изображения',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    # рейтинг для ленты популярного, см. posts.popularity
+    popularity = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-popularity', '-id'),
+                name='post_popularity_idx'
+            ),
+            # поиск постов по файлу картинки
+            models.Index(fields=('image',), name='post_image_idx'),
+        ]
 
     def __str__(self):
         return self.text[:POST_NAME_LETTERS_COUNT]
@@ -92,6 +143,12 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', 'created', 'id'),
+                name='comment_post_created_idx'
+            )
+        ]
 
     def __str__(self):
         return self.text[:COMMENT_NAME_LETTERS_COUNT]
@@ -120,3 +177,82 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class FeedEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя.
+
+    Заполняется при публикации поста (fan-out on write), чтобы лента
+    /follow/ читалась диапазоном по индексу (user, pub_date, id)
+    вместо JOIN по подпискам.
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='Читатель',
+        related_name='feed_entries',
+        on_delete=models.CASCADE
+    )
+    post = models.ForeignKey(
+        'Post',
+        verbose_name='Пост',
+        related_name='feed_entries',
+        on_delete=models.CASCADE
+    )
+    pub_date = models.DateTimeField('Дата поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-id'),
+                name='feed_user_pub_date_idx'
+            )
+        ]
+
+
+class AuthorStats(models.Model):
+    """Счётчики пользователя, которые поддерживаются при изменениях,
+    чтобы не считать их COUNT-запросами при каждом показе страницы.
+    """
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        related_name='stats',
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики автора'
+        verbose_name_plural = 'Счётчики авторов'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class StoredImage(models.Model):
+    """Счётчик ссылок на файл картинки в ContentHashStorage.
+
+    Увеличивается при сохранении файла, уменьшается при удалении или
+    замене картинки поста - в той же транзакции, что и пост. Файл
+    удаляет задача release_image, только если счётчик равен нулю.
+    """
+    name = models.CharField('Файл', max_length=255, primary_key=True)
+    references = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,366 @@
+import hashlib
+import math
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    quote_etag,
+)
+from django.utils.http import http_date
+
+from core import replicas
+from core.caches import shared_timeout
+from .models import Follow, Group, Post
+
+User = get_user_model()
+
+# время жизни страницы в кэше: None - пока не изменятся данные;
+# с локальным для процесса кэшем - не больше LOCAL_CACHE_TIMEOUT
+PAGE_CACHE_TIMEOUT = None
+# сколько секунд один процесс может пересобирать страницу под замком
+PAGE_LOCK_TIMEOUT = 10
+VERSION_KEY_PREFIX = 'posts:version:'
+PAGE_KEY_PREFIX = 'posts:page:'
+LATEST_KEY_PREFIX = 'posts:page-latest:'
+LOCK_KEY_PREFIX = 'posts:page-lock:'
+STATS_KEY_PREFIX = 'posts:page-stats:'
+LOOKUP_KEY_PREFIX = 'posts:page-lookup:'
+# счётчики для мониторинга
+STATS_HIT = 'hit'
+STATS_MISS = 'miss'
+STATS_STALE = 'stale'
+STATS_NAMES = (STATS_HIT, STATS_MISS, STATS_STALE)
+
+# области, версии которых входят в ключ страницы
+GLOBAL_SCOPE = 'global'
+INDEX_SCOPE = 'index'
+POPULAR_SCOPE = 'popular'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def feed_scope(user_id):
+    return f'feed:{user_id}'
+
+
+def new_version():
+    """Версия области: момент смены и случайная часть для уникальности"""
+    return f'{time.time():.6f}:{uuid.uuid4().hex}'
+
+
+def version_time(version):
+    """Момент смены версии; у версий старого формата - текущий"""
+    try:
+        return float(version.split(':', 1)[0])
+    except ValueError:
+        return time.time()
+
+
+def _set_new_versions(scopes):
+    cache.set_many(
+        {VERSION_KEY_PREFIX + scope: new_version() for scope in scopes},
+        shared_timeout()
+    )
+
+
+def bump(*scopes):
+    """Сменяет версии областей: все страницы с ними станут промахом.
+
+    Повторная смена после коммита не даёт закэшировать страницу,
+    собранную параллельным запросом до фиксации транзакции.
+    """
+    if scopes:
+        _set_new_versions(scopes)
+        transaction.on_commit(lambda: _set_new_versions(scopes))
+
+
+def get_versions(scopes):
+    keys = [VERSION_KEY_PREFIX + scope for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, shared_timeout())
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def page_variant(request):
+    """Анонимный вариант страницы общий, у авторизованного - свой.
+
+    Для авторизованных в вариант входит CSRF-cookie, чтобы токен
+    в закэшированной форме совпадал с секретом пользователя.
+    """
+    if not request.user.is_authenticated:
+        return 'anonymous'
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return f'user:{request.user.pk}:{csrf_cookie}'
+
+
+def _digest(*parts):
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def page_key(request, scopes):
+    return PAGE_KEY_PREFIX + _digest(
+        request.get_full_path(), page_variant(request), *get_versions(scopes))
+
+
+def latest_key(request):
+    """Ключ последней собранной версии страницы, независимый от версий"""
+    return LATEST_KEY_PREFIX + _digest(
+        request.get_full_path(), page_variant(request))
+
+
+def acquire_lock(key):
+    return cache.add(LOCK_KEY_PREFIX + key, 1, PAGE_LOCK_TIMEOUT)
+
+
+def release_lock(key):
+    cache.delete(LOCK_KEY_PREFIX + key)
+
+
+def count(name):
+    key = STATS_KEY_PREFIX + name
+    if not cache.add(key, 1, None):
+        cache.incr(key)
+
+
+def get_stats():
+    """Счётчики попаданий, промахов и отдач устаревшей страницы"""
+    values = cache.get_many([STATS_KEY_PREFIX + name for name in STATS_NAMES])
+    return {
+        name: values.get(STATS_KEY_PREFIX + name, 0) for name in STATS_NAMES
+    }
+
+
+def is_cacheable(request, response):
+    if response.status_code != 200:
+        return False
+    # токен выдан под только что созданный секрет: в кэш нельзя
+    return not (
+        request.META.get('CSRF_COOKIE_USED')
+        and settings.CSRF_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def replica_may_lag(scopes):
+    """Страница прочитана из реплики, которая могла ещё не догнать
+    последние изменения её областей
+    """
+    if not replicas.used_replica():
+        return False
+    return replicas.may_lag(max(map(version_time, get_versions(scopes))))
+
+
+def page_timeout(scopes):
+    if replica_may_lag(scopes):
+        # пересобрать, когда реплика гарантированно догонит основную БД
+        return getattr(settings, 'REPLICA_MAX_LAG', replicas.REPLICA_MAX_LAG)
+    return shared_timeout(PAGE_CACHE_TIMEOUT)
+
+
+def cache_when_streamed(response, keys, timeout=PAGE_CACHE_TIMEOUT):
+    """Кэширует потоковый ответ, когда он целиком отдан клиенту.
+
+    Из кэша он отдаётся уже обычным ответом с готовым телом.
+    """
+    content = response.streaming_content
+
+    def stream():
+        chunks = []
+        for chunk in content:
+            chunks.append(chunk)
+            yield chunk
+        cached = HttpResponse(
+            b''.join(chunks), content_type=response['Content-Type'])
+        cache.set_many(dict.fromkeys(keys, cached), timeout)
+
+    response.streaming_content = stream()
+
+
+def request_scopes(request, get_scopes, kwargs):
+    """Области страницы, вычисленные один раз за запрос"""
+    computed = request.__dict__.setdefault('_page_scopes', {})
+    if get_scopes not in computed:
+        computed[get_scopes] = [GLOBAL_SCOPE] + list(
+            get_scopes(request, **kwargs))
+    return computed[get_scopes]
+
+
+def cached_page(get_scopes):
+    """Кэширует GET-ответ view с ключом из версий областей get_scopes.
+
+    get_scopes(request, **kwargs) возвращает области, от которых зависит
+    страница. Сигналы меняют их версии при изменении данных, поэтому
+    страница хранится без срока и пересобирается только после изменений.
+    Пересобирает страницу один процесс под замком, остальные в это время
+    отдают предыдущую версию, если она есть. Замок и предыдущая версия
+    лежат в кэше default, поэтому между процессами это работает только
+    с общим бэкендом (см. core.caches.check_shared_caches).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = request_scopes(request, get_scopes, kwargs)
+            key = page_key(request, scopes)
+            response = cache.get(key)
+            if response is not None:
+                count(STATS_HIT)
+                return response
+            locked = acquire_lock(key)
+            if not locked:
+                stale = cache.get(latest_key(request))
+                if stale is not None:
+                    count(STATS_STALE)
+                    # у устаревшей копии не должно быть валидаторов
+                    # текущих версий, иначе клиент закрепит её у себя
+                    stale.is_stale_page = True
+                    return stale
+            count(STATS_MISS)
+            try:
+                response = view(request, *args, **kwargs)
+                if response.streaming and is_cacheable(request, response):
+                    cache_when_streamed(
+                        response, [key, latest_key(request)],
+                        page_timeout(scopes))
+                elif is_cacheable(request, response):
+                    cache.set_many(
+                        {key: response, latest_key(request): response},
+                        page_timeout(scopes)
+                    )
+            finally:
+                if locked:
+                    release_lock(key)
+            return response
+        return wrapper
+    return decorator
+
+
+def page_validators(get_scopes):
+    """ETag и Last-Modified из версий областей get_scopes.
+
+    Валидаторы вычисляются до запросов view: при совпадении
+    If-None-Match или If-Modified-Since ответ 304 отдаётся сразу.
+    Last-Modified точен до секунды, поэтому, пока секунда последнего
+    изменения не закончилась, он не отдаётся и не проверяется: иначе
+    изменение в ту же секунду клиент с If-Modified-Since не заметил бы.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = request_scopes(request, get_scopes, kwargs)
+            versions = get_versions(scopes)
+            etag = quote_etag(_digest(
+                request.get_full_path(), page_variant(request), *versions))
+            last_modified = math.ceil(max(map(version_time, versions)))
+            if last_modified > time.time():
+                last_modified = None
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not (
+                getattr(response, 'is_stale_page', False)
+                or replica_may_lag(scopes)
+            ):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+                # без no-cache браузер по Last-Modified сам решит,
+                # сколько держать страницу, и не спросит сервер
+                patch_cache_control(response, no_cache=True)
+                if request.user.is_authenticated:
+                    patch_cache_control(response, private=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_lookup(name, key, compute):
+    """Неизменяемое соответствие (автор поста, id по username) из кэша,
+    чтобы вычисление областей страницы не ходило в БД
+    """
+    cache_key = f'{LOOKUP_KEY_PREFIX}{name}:{key}'
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            cache.set(cache_key, value, shared_timeout())
+    return value
+
+
+def forget_username(username):
+    cache.delete(f'{LOOKUP_KEY_PREFIX}username:{username}')
+
+
+def index_scopes(request):
+    return [INDEX_SCOPE]
+
+
+def popular_scopes(request):
+    return [POPULAR_SCOPE]
+
+
+def group_scopes(request, slug):
+    return [group_scope(slug)]
+
+
+def profile_scopes(request, username):
+    author_id = cached_lookup('username', username, lambda: (
+        User.objects.filter(
+            username=username).values_list('pk', flat=True).first()))
+    return [author_scope(author_id)]
+
+
+def post_detail_scopes(request, post_id):
+    author_id = cached_lookup('post-author', post_id, lambda: (
+        Post.objects.filter(
+            pk=post_id).values_list('author_id', flat=True).first()))
+    return [post_scope(post_id), author_scope(author_id)]
+
+
+def post_comments_scopes(request, post_id):
+    return [post_scope(post_id)]
+
+
+def follow_index_scopes(request):
+    return [feed_scope(request.user.pk)]
+
+
+def bump_post(post_id, author_id, group_ids):
+    """Сбрасывает страницы, на которых показан пост"""
+    follower_ids = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    group_slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk]).values_list('slug', flat=True)
+    bump(
+        INDEX_SCOPE,
+        POPULAR_SCOPE,
+        post_scope(post_id),
+        author_scope(author_id),
+        *(group_scope(slug) for slug in group_slugs),
+        *(feed_scope(user_id) for user_id in follower_ids)
+    )
@@ -0,0 +1,140 @@
+import math
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from jobs.queue import enqueue
+from . import page_cache
+from .models import Post
+
+# точка отсчёта времени для рейтинга (2023-01-01 UTC)
+POPULARITY_EPOCH = 1672531200
+# через сколько секунд вес события уменьшается вдвое
+POPULARITY_HALF_LIFE = 24 * 3600
+# веса событий
+POST_WEIGHT = 10
+COMMENT_WEIGHT = 10
+VIEW_WEIGHT = 1
+# просмотры копятся в кэше и попадают в рейтинг пачками
+VIEW_BATCH = 10
+VIEWS_KEY_PREFIX = 'posts:popularity-views:'
+# сколько раз повторять обновление, если рейтинг меняют параллельно
+UPDATE_ATTEMPTS = 5
+# страница /popular/ сбрасывается не чаще раза в столько секунд
+POPULAR_BUMP_INTERVAL = 60
+POPULAR_BUMP_KEY = 'posts:popularity-bumped'
+POPULAR_PENDING_KEY = 'posts:popularity-pending'
+BUMP_POPULAR_TASK = 'posts.bump_popular'
+
+
+def event_rank(weight, timestamp):
+    """Рейтинг одного события в логарифмической шкале.
+
+    Вместо того чтобы уменьшать вес старых событий, вес новых растёт
+    вдвое за каждый POPULARITY_HALF_LIFE (forward decay). Порядок постов
+    при этом тот же, что и у убывающего со временем счёта, но хранимое
+    значение не нужно пересчитывать: оно меняется только при событиях.
+    Логарифм не даёт числу переполниться.
+    """
+    return math.log2(weight) + (
+        timestamp - POPULARITY_EPOCH) / POPULARITY_HALF_LIFE
+
+
+def add_rank(rank, other):
+    """Рейтинг суммы весов: log2(2 ** rank + 2 ** other) без переполнения"""
+    high, low = max(rank, other), min(rank, other)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def initial_rank(pub_date, comments_count=0):
+    """Рейтинг поста, как если бы все его комментарии пришли с ним"""
+    return event_rank(
+        POST_WEIGHT + COMMENT_WEIGHT * comments_count, pub_date.timestamp())
+
+
+def bump_popular():
+    page_cache.bump(page_cache.POPULAR_SCOPE)
+
+
+def schedule_bump_popular():
+    """Сбрасывает /popular/ не чаще раза в POPULAR_BUMP_INTERVAL.
+
+    Первое событие за интервал сбрасывает страницу сразу, а для
+    следующих ставится одна отложенная задача на конец интервала,
+    так что изменения рейтинга видны не позже чем через интервал.
+    """
+    if cache.add(POPULAR_BUMP_KEY, True, POPULAR_BUMP_INTERVAL):
+        bump_popular()
+    elif cache.add(POPULAR_PENDING_KEY, True, POPULAR_BUMP_INTERVAL):
+        enqueue(BUMP_POPULAR_TASK, delay=POPULAR_BUMP_INTERVAL)
+
+
+def record_event(post_id, weight):
+    """Добавляет к рейтингу поста событие с весом weight.
+
+    Новое значение считается в Python и записывается условным UPDATE
+    (только если рейтинг не успели изменить), поэтому блокировки
+    не нужны. Запись идёт прямо в основную БД, минуя роутер: счётчик
+    просмотров не должен закреплять чтения пользователя за ней.
+    """
+    rank = event_rank(weight, time.time())
+    posts = Post.objects.using(DEFAULT_DB_ALIAS).filter(pk=post_id)
+    for _ in range(UPDATE_ATTEMPTS):
+        current = posts.values_list('popularity', flat=True).first()
+        if current is None:
+            return
+        # update() не вызывает post_save: остальные страницы не сбрасываются
+        if posts.filter(popularity=current).update(
+            popularity=add_rank(current, rank)
+        ):
+            schedule_bump_popular()
+            return
+
+
+def record_comment(post_id):
+    record_event(post_id, COMMENT_WEIGHT)
+
+
+def record_view(post_id):
+    """Учитывает просмотр поста; в БД пишется каждый VIEW_BATCH-й"""
+    key = f'{VIEWS_KEY_PREFIX}{post_id}'
+    cache.add(key, 0, None)
+    try:
+        views = cache.incr(key)
+    except ValueError:
+        # ключ вытеснен из кэша между add и incr
+        return
+    if views % VIEW_BATCH == 0:
+        record_event(post_id, VIEW_WEIGHT * VIEW_BATCH)
+
+
+def counts_views(view):
+    """Учитывает просмотр страницы поста, в том числе отданной из кэша"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        # 304 - повторная проверка той же страницы, а не новый просмотр
+        if request.method == 'GET' and response.status_code == 200:
+            record_view(kwargs['post_id'])
+        return response
+    return wrapper
+
+
+def recount_popularity(post_ids=None):
+    """Пересчитывает рейтинг по дате и количеству комментариев.
+
+    Нужен после массовых вставок в обход сигналов; накопленные
+    просмотры при этом теряются.
+    """
+    posts = Post.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    changed = []
+    for post in posts.only('pk', 'pub_date', 'comments_count').iterator():
+        post.popularity = initial_rank(post.pub_date, post.comments_count)
+        changed.append(post)
+    Post.objects.bulk_update(changed, ['popularity'], batch_size=500)
+    if changed:
+        page_cache.bump(page_cache.POPULAR_SCOPE)
@@ -0,0 +1,179 @@
+import re
+
+from django.db import connection
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import Post
+from .utils import (
+    CURSOR_NEXT,
+    CURSOR_PREVIOUS,
+    CURSOR_SEPARATOR,
+    POSTS_PER_PAGE,
+    CursorPage,
+)
+
+FTS_TABLE = 'posts_post_fts'
+
+# полнотекстовый индекс SQLite FTS5 поверх posts_post и триггеры,
+# которые поддерживают его при вставке, изменении и удалении постов
+FTS_INSTALL_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"text, content='posts_post', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai "
+    f"AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad "
+    f"AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au "
+    f"AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+)
+FTS_REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+FTS_DROP_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fts_available(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def install_fts(conn=connection, rebuild=False):
+    """Создаёт индекс и триггеры, если их нет.
+
+    SQLite пересоздаёт таблицу при многих миграциях и теряет триггеры,
+    поэтому функция вызывается и после каждого migrate.
+    """
+    if not fts_available(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+            "AND name = %s", [f'{FTS_TABLE}_ai']
+        )
+        missing_triggers = cursor.fetchone() is None
+        for sql in FTS_INSTALL_SQL:
+            cursor.execute(sql)
+        if rebuild or missing_triggers:
+            cursor.execute(FTS_REBUILD_SQL)
+
+
+def drop_fts(conn=connection):
+    if not fts_available(conn):
+        return
+    with conn.cursor() as cursor:
+        for sql in FTS_DROP_SQL:
+            cursor.execute(sql)
+
+
+def to_match_query(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5:
+    каждое слово в кавычках, все слова обязательны
+    """
+    return ' '.join(f'"{word}"' for word in WORD_RE.findall(query))
+
+
+def matching_ids_sql(query):
+    """SQL и параметры подзапроса id постов, подходящих под запрос"""
+    return (
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [to_match_query(query)]
+    )
+
+
+def encode_search_cursor(rank, pk, direction):
+    raw = CURSOR_SEPARATOR.join((direction, repr(rank), str(pk)))
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_search_cursor(cursor):
+    try:
+        raw = urlsafe_base64_decode(cursor).decode()
+        direction, rank, pk = raw.split(CURSOR_SEPARATOR)
+        rank, pk = float(rank), int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        return None
+    return direction, rank, pk
+
+
+class SearchPaginator:
+    """Курсорная пагинация результатов поиска по (rank, id).
+
+    rank - релевантность bm25 из FTS5 (чем меньше, тем релевантнее).
+    """
+
+    def __init__(self, query, per_page=POSTS_PER_PAGE):
+        self.query = query
+        self.per_page = per_page
+        self.ranks = {}
+
+    def cursor_for(self, post, direction):
+        return encode_search_cursor(self.ranks[post.pk], post.pk, direction)
+
+    def _fetch_ranked(self, after=None, descending=False):
+        sql = (
+            f'SELECT rowid, rank FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s'
+        )
+        params = [to_match_query(self.query)]
+        if after is not None:
+            rank, pk = after
+            op = '<' if descending else '>'
+            sql += f' AND (rank {op} %s OR (rank = %s AND rowid {op} %s))'
+            params += [rank, rank, pk]
+        order = 'DESC' if descending else 'ASC'
+        sql += f' ORDER BY rank {order}, rowid {order} LIMIT %s'
+        params.append(self.per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _fetch_fallback(self):
+        posts = Post.objects.filter(text__icontains=self.query).order_by(
+            '-pub_date', '-id').values_list('id', flat=True)
+        return [(pk, 0.0) for pk in posts[:self.per_page + 1]]
+
+    def get_page(self, cursor=None):
+        decoded = decode_search_cursor(cursor) if cursor else None
+        if not to_match_query(self.query):
+            return self._page([], has_next=False, has_previous=False)
+        if not fts_available():
+            rows = self._fetch_fallback()
+            return self._page(
+                rows[:self.per_page], has_next=False, has_previous=False)
+        if decoded is None:
+            rows = self._fetch_ranked()
+            return self._page(
+                rows[:self.per_page],
+                has_next=len(rows) > self.per_page, has_previous=False)
+        direction, rank, pk = decoded
+        if direction == CURSOR_NEXT:
+            rows = self._fetch_ranked(after=(rank, pk))
+            return self._page(
+                rows[:self.per_page],
+                has_next=len(rows) > self.per_page, has_previous=True)
+        rows = self._fetch_ranked(after=(rank, pk), descending=True)
+        page = rows[:self.per_page]
+        page.reverse()
+        return self._page(
+            page, has_next=True, has_previous=len(rows) > self.per_page)
+
+    def _page(self, rows, has_next, has_previous):
+        self.ranks = dict(rows)
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            self.ranks)
+        object_list = [posts[pk] for pk, _ in rows if pk in posts]
+        return CursorPage(object_list, self, has_next, has_previous)
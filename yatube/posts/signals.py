@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import page_cache
+from .counters import change_author_stats, change_comments_count
+from .follows import forget_following
+from .models import Comment, Follow, Group, Post
+from .popularity import initial_rank, record_comment
+from .thumbnails import schedule_release_image
+from .timeline import backfill_feed, fan_out_post, remove_author_from_feed
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_popularity_initial(sender, instance, **kwargs):
+    if instance._state.adding and not instance.popularity:
+        # pub_date проставится при сохранении
+        instance.popularity = initial_rank(
+            instance.pub_date or timezone.now())
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, posts_count=1)
+        fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, posts_count=-1)
+    schedule_release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def post_image_replaced(sender, instance, created, **kwargs):
+    if 'image' not in instance.__dict__:
+        # поле не загружалось (only/defer), значит и не менялось
+        return
+    name = instance.image.name
+    if not created and instance._loaded_image not in (None, name):
+        schedule_release_image(instance._loaded_image)
+    instance._loaded_image = name
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        change_comments_count(instance.post_id, 1)
+        record_comment(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        change_author_stats(instance.author_id, followers_count=1)
+        change_author_stats(instance.user_id, following_count=1)
+        backfill_feed(instance.user_id, instance.author_id)
+        forget_following(instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, followers_count=-1)
+    change_author_stats(instance.user_id, following_count=-1)
+    remove_author_from_feed(instance.user_id, instance.author_id)
+    forget_following(instance.user_id)
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # группа до редактирования: её страницу тоже нужно сбросить
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    # прежняя картинка: файл удаляется, если на него больше нет ссылок
+    image = instance.__dict__.get('image')
+    instance._loaded_image = image if isinstance(image, str) else None
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed_invalidate(sender, instance, **kwargs):
+    page_cache.bump_post(
+        instance.pk,
+        instance.author_id,
+        {instance.group_id, instance._loaded_group_id}
+    )
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed_invalidate(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).values(
+        'author_id', 'group_id').first()
+    if post is not None:
+        page_cache.bump_post(
+            instance.post_id, post['author_id'], {post['group_id']})
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed_invalidate(sender, instance, **kwargs):
+    page_cache.bump(
+        page_cache.author_scope(instance.author_id),
+        page_cache.author_scope(instance.user_id),
+        page_cache.feed_scope(instance.user_id)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed_invalidate(sender, instance, **kwargs):
+    page_cache.bump(page_cache.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=User)
+def user_changed_invalidate(sender, instance, created, update_fields,
+                            **kwargs):
+    # вход на сайт обновляет только last_login и на страницы не влияет
+    if update_fields == frozenset(('last_login',)):
+        return
+    # username мог раньше принадлежать другому пользователю
+    page_cache.forget_username(instance.username)
+    if not created:
+        page_cache.bump(page_cache.GLOBAL_SCOPE)
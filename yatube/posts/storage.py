@@ -0,0 +1,73 @@
+import hashlib
+import posixpath
+
+from django.apps import apps
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+
+def add_reference(name):
+    """Увеличивает счётчик ссылок на файл, создавая его при надобности.
+
+    UPDATE блокирует строку до конца транзакции, поэтому задача
+    release_image не удалит файл, пока загрузка не зафиксирована.
+    """
+    StoredImage = apps.get_model('posts', 'StoredImage')
+    images = StoredImage.objects.filter(name=name)
+    if images.update(references=F('references') + 1):
+        return
+    try:
+        with transaction.atomic():
+            StoredImage.objects.create(name=name, references=1)
+    except IntegrityError:
+        # строку только что создала параллельная загрузка
+        images.update(references=F('references') + 1)
+
+
+def content_hash(content):
+    """SHA-256 содержимого файла, прочитанного по частям"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Называет файлы по хэшу содержимого: posts/ab/abcd….jpg.
+
+    Одинаковые загрузки получают одно имя и хранятся один раз, а раз
+    имя исходника общее, то и миниатюры sorl-thumbnail у них общие.
+    Каждое сохранение увеличивает счётчик ссылок (StoredImage) до
+    проверки, есть ли файл, поэтому параллельное удаление либо
+    завершится раньше и файл будет записан заново, либо увидит ссылку
+    (см. posts.thumbnails.release_image).
+    """
+
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(
+                f'Имя файла {name} длиннее {max_length} символов')
+        add_reference(name)
+        if self.exists(name):
+            # такой файл уже загружали
+            return name
+        return super().save(name, content, max_length)
+
+
+post_image_storage = ContentHashStorage()
@@ -0,0 +1,24 @@
+from jobs.queue import task
+
+from .popularity import BUMP_POPULAR_TASK, bump_popular
+from .thumbnails import (
+    GENERATE_THUMBNAILS_TASK,
+    RELEASE_IMAGE_TASK,
+    generate_thumbnails,
+    release_image,
+)
+
+
+@task(GENERATE_THUMBNAILS_TASK)
+def generate_thumbnails_task(image_name, post_id=None):
+    generate_thumbnails(image_name, post_id)
+
+
+@task(RELEASE_IMAGE_TASK)
+def release_image_task(image_name):
+    release_image(image_name)
+
+
+@task(BUMP_POPULAR_TASK)
+def bump_popular_task():
+    bump_popular()
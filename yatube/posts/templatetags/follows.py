@@ -0,0 +1,13 @@
+from django import template
+
+from posts.follows import get_following_ids
+
+register = template.Library()
+
+
+@register.filter
+def follows(user, author):
+    """{% if request.user|follows:author %} без запроса на каждого автора:
+    набор подписок читается один раз за запрос
+    """
+    return author.pk in get_following_ids(user)
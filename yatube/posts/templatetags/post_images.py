@@ -0,0 +1,10 @@
+from django import template
+
+from posts.thumbnails import ready_picture as get_ready_picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_picture(file_):
+    return get_ready_picture(file_)
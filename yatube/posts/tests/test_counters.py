@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.counters import get_author_stats
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.user = User.objects.create_user(username='test_user')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_posts_count(self):
+        """Счётчик постов меняется при создании и удалении поста"""
+        get_author_stats(self.user_author)
+        post = Post.objects.create(author=self.user_author, text='Text')
+        self.assertEqual(self.stats(self.user_author).posts_count, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.user_author).posts_count, 0)
+
+    def test_follow_counts(self):
+        """Подписка и отписка меняют счётчики обоих пользователей"""
+        get_author_stats(self.user_author)
+        get_author_stats(self.user)
+        Follow.objects.create(user=self.user, author=self.user_author)
+        self.assertEqual(self.stats(self.user_author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.stats(self.user_author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_comments_count(self):
+        """Счётчик комментариев меняется при добавлении и удалении"""
+        post = Post.objects.create(author=self.user_author, text='Text')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Comment')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_cascade_delete(self):
+        """Удаление пользователя обновляет счётчики его подписок"""
+        get_author_stats(self.user_author)
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=self.user_author)
+        follower.delete()
+        self.assertEqual(self.stats(self.user_author).followers_count, 0)
+
+    def test_recount_command_fixes_drift(self):
+        """Команда recount_counters исправляет разошедшиеся счётчики"""
+        post = Post.objects.create(author=self.user_author, text='Text')
+        Comment.objects.create(post=post, author=self.user, text='Comment')
+        Follow.objects.create(user=self.user, author=self.user_author)
+        AuthorStats.objects.update(
+            posts_count=10, followers_count=10, following_count=10)
+        Post.objects.update(comments_count=10)
+        call_command('recount_counters', stdout=StringIO())
+        stats = self.stats(self.user_author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(stats.following_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
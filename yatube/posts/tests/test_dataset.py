@@ -0,0 +1,31 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, FeedEntry, Follow, Post
+
+DATASET_OPTIONS = {
+    'users': 20, 'groups': 3, 'posts': 200, 'comments': 100, 'follows': 40
+}
+
+
+class GenerateDatasetTests(TestCase):
+    def test_dataset_is_consistent(self):
+        """Генератор заполняет БД и пересчитывает производные данные"""
+        call_command('generate_dataset', stdout=StringIO(), **DATASET_OPTIONS)
+        self.assertEqual(Post.objects.count(), DATASET_OPTIONS['posts'])
+        self.assertEqual(Comment.objects.count(), DATASET_OPTIONS['comments'])
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            DATASET_OPTIONS['posts'])
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)),
+            DATASET_OPTIONS['comments'])
+        self.assertEqual(
+            FeedEntry.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count()
+            if Follow.objects.exists() else 0)
+        # даты разнесены во времени, а не совпадают с моментом вставки
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1)
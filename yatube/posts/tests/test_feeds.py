@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.feeds import FEED_ITEMS
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user_author,
+            group=cls.group,
+            text='Тестовый текст поста'
+        )
+        cls.feed_urls = [
+            reverse('posts:index_rss'),
+            reverse('posts:index_atom'),
+            reverse('posts:group_rss', args=[cls.group.slug]),
+            reverse('posts:group_atom', args=[cls.group.slug]),
+            reverse('posts:profile_rss', args=[cls.user_author.username]),
+            reverse('posts:profile_atom', args=[cls.user_author.username]),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def read(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def test_feeds_are_streamed_then_cached(self):
+        """Лента собирается потоком, повторно отдаётся из кэша"""
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.streaming)
+                body = self.read(response)
+                self.assertIn(self.post.text, body)
+                self.assertIn(
+                    reverse('posts:post_detail', args=[self.post.pk]), body)
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url)
+                self.assertFalse(response.streaming)
+                self.assertEqual(self.read(response), body)
+
+    def test_posts_are_read_while_streaming(self):
+        """Тексты постов читаются уже при отдаче потока, а не до ответа"""
+        url = reverse('posts:index_rss')
+        with CaptureQueriesContext(connection) as before:
+            response = self.guest_client.get(url)
+        self.assertFalse(any(
+            '"posts_post"."text"' in query['sql']
+            for query in before.captured_queries))
+        with CaptureQueriesContext(connection) as during:
+            body = self.read(response)
+        self.assertIn(self.post.text, body)
+        self.assertTrue(any(
+            '"posts_post"."text"' in query['sql']
+            for query in during.captured_queries))
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост сразу попадает во все свои ленты"""
+        for url in self.feed_urls:
+            self.read(self.guest_client.get(url))
+        Post.objects.create(
+            author=self.user_author, group=self.group, text='Свежий пост')
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                self.assertIn(
+                    'Свежий пост', self.read(self.guest_client.get(url)))
+
+    def test_conditional_get(self):
+        """Опрос неизменившейся ленты отвечает 304 без запросов к БД"""
+        for url in self.feed_urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.read(response)
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_feed_size_is_limited(self):
+        """В ленте не больше FEED_ITEMS последних постов"""
+        Post.objects.bulk_create(
+            Post(author=self.user_author, text=f'Пост {i}')
+            for i in range(FEED_ITEMS)
+        )
+        body = self.read(self.guest_client.get(reverse('posts:index_rss')))
+        self.assertEqual(body.count('<item>'), FEED_ITEMS)
+        self.assertNotIn(self.post.text, body)
+
+    def test_unknown_objects(self):
+        """Лента несуществующей группы - 404"""
+        response = self.guest_client.get(
+            reverse('posts:group_rss', args=['missing']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
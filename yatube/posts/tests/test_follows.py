@@ -0,0 +1,84 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.caches import LOCAL_CACHE_TIMEOUT
+from posts.follows import get_following_ids, is_following
+from posts.models import Follow
+
+User = get_user_model()
+
+AUTHORS_COUNT = 5
+
+
+class FollowSetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.authors = [
+            User.objects.create_user(username=f'test_auth_{i}')
+            for i in range(AUTHORS_COUNT)
+        ]
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_user(self):
+        # новый объект, как request.user в следующем запросе
+        return User.objects.get(pk=self.user.pk)
+
+    def test_one_query_for_many_authors(self):
+        """Проверка подписки на всех авторов стоит одного запроса"""
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            following = [is_following(user, author) for author in self.authors]
+        self.assertEqual(following, [True] + [False] * (AUTHORS_COUNT - 1))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            is_following(user, self.authors[0])
+        self.assertFalse(is_following(AnonymousUser(), self.authors[0]))
+
+    def test_follow_and_unfollow_reset_cached_set(self):
+        """Подписка и отписка сбрасывают закэшированный набор"""
+        get_following_ids(self.fresh_user())
+        client = Client()
+        client.force_login(self.user)
+        author = self.authors[1]
+        client.get(reverse('posts:profile_follow', args=[author.username]))
+        self.assertTrue(is_following(self.fresh_user(), author))
+        client.get(reverse('posts:profile_unfollow', args=[author.username]))
+        self.assertFalse(is_following(self.fresh_user(), author))
+
+    def test_local_cache_bounds_lifetime(self):
+        """С локальным кэшем подписку из другого процесса видно через
+        LOCAL_CACHE_TIMEOUT
+        """
+        author = self.authors[1]
+        self.assertFalse(is_following(self.fresh_user(), author))
+        # подписка без сигнала: сброс достался бы другому процессу
+        Follow.objects.bulk_create([Follow(user=self.user, author=author)])
+        self.assertFalse(is_following(self.fresh_user(), author))
+        later = time.time() + LOCAL_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertTrue(is_following(self.fresh_user(), author))
+
+    def test_template_filter(self):
+        """Фильтр follows отвечает по тому же набору подписок"""
+        template = Template(
+            '{% load follows %}'
+            '{% for author in authors %}{{ user|follows:author|yesno:"1,0" }} '
+            '{% endfor %}'
+        )
+        context = Context(
+            {'user': self.fresh_user(), 'authors': self.authors[:2]})
+        with self.assertNumQueries(1):
+            rendered = template.render(context)
+        self.assertEqual(rendered, '1 0 ')
@@ -3,6 +3,7 @@ import tempfile
 
 from django.urls import reverse
 from posts.models import Post, Group
+from posts.storage import post_image_storage
 from django.test import Client, TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.conf import settings
@@ -21,6 +22,11 @@ POST_CREATE_URL = '/create/'
 POST_COMMENT_URL_NAME = 'posts:add_comment'
 
 
+def stored_name(uploaded):
+    """Имя, под которым хранилище сохранит загруженную картинку"""
+    return post_image_storage.hashed_name(f'posts/{uploaded.name}', uploaded)
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostFormTests(TestCase):
     @classmethod
@@ -94,7 +100,7 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text=form_data['text'],
                 group=form_data['group'],
-                image=f'posts/{self.uploaded_1.name}',
+                image=stored_name(self.uploaded_1),
                 author=self.user_author
             ).exists()
         )
@@ -141,7 +147,7 @@ class PostFormTests(TestCase):
             response.context.get('post').author, self.user_author)
         self.assertEqual(
             response.context.get('post').image.name,
-            f'posts/{self.uploaded_2.name}')
+            stored_name(self.uploaded_2))
         self.assertEqual(Post.objects.count(), post_count)
 
     def test_add_comment(self):
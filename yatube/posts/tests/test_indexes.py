@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.const import (
+    FOLLOW_INDEX_URL_NAME,
+    GROUP_LIST_URL_NAME,
+    INDEX_URL_NAME,
+    POPULAR_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    PROFILE_URL_NAME,
+)
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import CURSOR_NEXT, CURSOR_PREVIOUS, encode_cursor
+
+User = get_user_model()
+
+# признак сортировки без индекса в выводе EXPLAIN QUERY PLAN SQLite
+TEMP_SORT_MARKER = 'USE TEMP B-TREE'
+# таблицы, запросы к которым должны идти по индексам
+INDEXED_TABLES = ('"posts_post"', '"posts_comment"', '"posts_feedentry"')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test-slug',
+            description='Test description'
+        )
+        Follow.objects.create(user=cls.user, author=cls.user_author)
+        cls.post = Post.objects.create(
+            author=cls.user_author,
+            text='Text test post',
+            group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Comment')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def popular_cursor(self, direction):
+        post = Post.objects.get(pk=self.post.pk)
+        return encode_cursor(post, direction, key_field='popularity')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_views_do_not_sort_without_index(self):
+        """Запросы страниц постов сортируются по индексу, а не в памяти"""
+        urls = [
+            reverse(INDEX_URL_NAME),
+            reverse(POPULAR_URL_NAME),
+            # листание рейтинга по курсору в обе стороны
+            reverse(POPULAR_URL_NAME) + '?cursor=' + self.popular_cursor(
+                CURSOR_NEXT),
+            reverse(POPULAR_URL_NAME) + '?cursor=' + self.popular_cursor(
+                CURSOR_PREVIOUS),
+            reverse(GROUP_LIST_URL_NAME, kwargs={'slug': self.group.slug}),
+            reverse(
+                PROFILE_URL_NAME,
+                kwargs={'username': self.user_author.username}
+            ),
+            reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.id}),
+            reverse(FOLLOW_INDEX_URL_NAME),
+        ]
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'ORDER BY' not in sql:
+                    continue
+                if not any(table in sql for table in INDEXED_TABLES):
+                    continue
+                with self.subTest(url=url, sql=sql):
+                    self.assertNotIn(TEMP_SORT_MARKER, self.explain(sql))
@@ -0,0 +1,243 @@
+import shutil
+import tempfile
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.caches import LOCAL_CACHE_TIMEOUT
+from posts.const import (
+    ADD_COMMENT_URL_NAME,
+    GROUP_LIST_URL_NAME,
+    INDEX_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    PROFILE_URL_NAME,
+    SEARCH_URL_NAME,
+)
+from posts.models import Group, Post
+from posts.page_cache import (
+    GLOBAL_SCOPE,
+    INDEX_SCOPE,
+    LOCK_KEY_PREFIX,
+    PAGE_LOCK_TIMEOUT,
+    bump,
+    get_stats,
+    page_key,
+)
+
+User = get_user_model()
+
+PAGE_CACHE_STATS_URL_NAME = 'posts:page_cache_stats'
+
+
+class PageCacheStampedeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.admin = User.objects.create_user(
+            username='admin', is_staff=True)
+        cls.index_url = reverse(INDEX_URL_NAME)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_hit_and_miss_counters(self):
+        """Первый запрос - промах, повторный - попадание"""
+        self.guest_client.get(self.index_url)
+        self.guest_client.get(self.index_url)
+        self.assertEqual(get_stats(), {'hit': 1, 'miss': 1, 'stale': 0})
+
+    def test_stale_page_served_while_locked(self):
+        """Пока страницу пересобирает другой процесс,
+        отдаётся предыдущая версия
+        """
+        response_1 = self.guest_client.get(self.index_url)
+        Post.objects.create(author=self.user_author, text='New post')
+        with mock.patch('posts.page_cache.acquire_lock', return_value=False):
+            response_2 = self.guest_client.get(self.index_url)
+        self.assertEqual(response_1.content, response_2.content)
+        self.assertFalse(response_2.has_header('ETag'))
+        self.assertEqual(get_stats()['stale'], 1)
+        response_3 = self.guest_client.get(self.index_url)
+        self.assertContains(response_3, 'New post')
+
+    def test_local_cache_bounds_page_lifetime(self):
+        """С локальным для процесса кэшем страница живёт недолго:
+        другие процессы не видят смены версий
+        """
+        self.guest_client.get(self.index_url)
+        later = time.time() + LOCAL_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.guest_client.get(self.index_url)
+        self.assertEqual(get_stats()['miss'], 2)
+
+    def test_stats_available_to_staff_only(self):
+        """Счётчики кэша доступны только персоналу"""
+        url = reverse(PAGE_CACHE_STATS_URL_NAME)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        response = admin_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(set(response.json()), {'hit', 'miss', 'stale'})
+
+
+SHARED_CACHE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_CACHE_DIR,
+    },
+})
+class SharedPageCacheTests(TestCase):
+    """Общий кэш: замок и предыдущая версия страницы видны всем процессам.
+
+    Другой процесс изображает отдельный экземпляр бэкенда над тем же
+    каталогом, без общего с тестом состояния в памяти.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.index_url = reverse(INDEX_URL_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SHARED_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.other_process = FileBasedCache(SHARED_CACHE_DIR, {})
+
+    def test_lock_held_by_other_process(self):
+        """Пока страницу пересобирает другой процесс, отдаётся
+        предыдущая версия, которую собрал тоже он
+        """
+        response_1 = self.guest_client.get(self.index_url)
+        Post.objects.create(author=self.user_author, text='New post')
+        request = RequestFactory().get(self.index_url)
+        request.user = AnonymousUser()
+        key = page_key(request, [GLOBAL_SCOPE, INDEX_SCOPE])
+        self.assertTrue(self.other_process.add(
+            LOCK_KEY_PREFIX + key, 1, PAGE_LOCK_TIMEOUT))
+        response_2 = self.guest_client.get(self.index_url)
+        self.assertEqual(response_1.content, response_2.content)
+        self.assertEqual(get_stats()['stale'], 1)
+        self.other_process.delete(LOCK_KEY_PREFIX + key)
+        self.assertContains(self.guest_client.get(self.index_url), 'New post')
+
+    def test_bump_seen_by_other_process(self):
+        """Смена версий видна другому процессу: его страница - промах"""
+        request = RequestFactory().get(self.index_url)
+        request.user = AnonymousUser()
+        key = page_key(request, [GLOBAL_SCOPE, INDEX_SCOPE])
+        self.guest_client.get(self.index_url)
+        self.assertIsNotNone(self.other_process.get(key))
+        Post.objects.create(author=self.user_author, text='New post')
+        self.assertNotEqual(
+            page_key(request, [GLOBAL_SCOPE, INDEX_SCOPE]), key)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user_author,
+            group=cls.group,
+            text='Тестовый текст поста'
+        )
+        cls.post_detail_url = reverse(
+            POST_DETAIL_URL_NAME, kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Неизменившиеся страницы отвечают 304 без запросов к БД"""
+        urls = [
+            reverse(INDEX_URL_NAME),
+            reverse(GROUP_LIST_URL_NAME, kwargs={'slug': self.group.slug}),
+            reverse(
+                PROFILE_URL_NAME,
+                kwargs={'username': self.user_author.username}),
+            self.post_detail_url,
+            reverse(SEARCH_URL_NAME) + '?q=текст',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response['Cache-Control'], 'no-cache')
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_last_modified_waits_for_second_to_end(self):
+        """Last-Modified не отдаётся, пока идёт секунда изменения,
+        и не даёт 304 на страницу, изменённую в ту же секунду
+        """
+        url = reverse(INDEX_URL_NAME)
+        self.assertFalse(self.guest_client.get(url).has_header(
+            'Last-Modified'))
+        now = time.time()
+        with mock.patch('time.time', return_value=now + 2):
+            last_modified = self.guest_client.get(url)['Last-Modified']
+            response = self.guest_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+            bump(INDEX_SCOPE)
+            response = self.guest_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertFalse(response.has_header('Last-Modified'))
+        with mock.patch('time.time', return_value=now + 4):
+            response = self.guest_client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertNotEqual(response['Last-Modified'], last_modified)
+
+    def test_comment_changes_post_detail_validators(self):
+        """Новый комментарий меняет ETag страницы поста"""
+        etag = self.guest_client.get(self.post_detail_url)['ETag']
+        self.authorized_client.post(
+            reverse(ADD_COMMENT_URL_NAME, kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый комментарий'})
+        response = self.guest_client.get(
+            self.post_detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Новый комментарий')
+
+    def test_private_pages_are_not_shared(self):
+        """Страница авторизованного пользователя не кэшируется на CDN"""
+        response = self.authorized_client.get(self.post_detail_url)
+        self.assertIn('private', response['Cache-Control'])
+        etag = self.authorized_client.get(self.post_detail_url)['ETag']
+        response = self.guest_client.get(
+            self.post_detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
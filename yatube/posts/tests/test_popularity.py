@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.const import (
+    ADD_COMMENT_URL_NAME,
+    POPULAR_URL_NAME,
+    POST_DETAIL_URL_NAME,
+)
+from jobs.models import Job
+from jobs.queue import run_pending
+from posts import page_cache
+from posts.models import Post
+from posts.popularity import (
+    BUMP_POPULAR_TASK,
+    POPULARITY_HALF_LIFE,
+    add_rank,
+    event_rank,
+    recount_popularity,
+)
+from posts.utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class PopularityTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user_author)
+        self.old_post = Post.objects.create(
+            author=self.user_author, text='Old post')
+        self.new_post = Post.objects.create(
+            author=self.user_author, text='New post')
+
+    def popular_posts(self):
+        response = self.guest_client.get(reverse(POPULAR_URL_NAME))
+        return list(response.context['page_obj'])
+
+    def test_rank_decays_with_time(self):
+        """Событие на период полураспада раньше весит вдвое меньше"""
+        self.assertAlmostEqual(
+            event_rank(2, 0), event_rank(1, POPULARITY_HALF_LIFE))
+        self.assertAlmostEqual(
+            add_rank(event_rank(3, 0), event_rank(5, 0)), event_rank(8, 0))
+
+    def test_new_post_ranks_first(self):
+        self.assertEqual(
+            self.popular_posts(), [self.new_post, self.old_post])
+
+    def test_comment_raises_post(self):
+        """Комментарий поднимает пост и сбрасывает кэш страницы"""
+        self.popular_posts()
+        self.authorized_client.post(
+            reverse(ADD_COMMENT_URL_NAME, args=[self.old_post.pk]),
+            data={'text': 'Comment'}
+        )
+        self.assertEqual(
+            self.popular_posts(), [self.old_post, self.new_post])
+
+    @mock.patch('posts.popularity.VIEW_BATCH', 2)
+    def test_views_counted_in_batches(self):
+        """Просмотры, в том числе из кэша, попадают в рейтинг пачками"""
+        url = reverse(POST_DETAIL_URL_NAME, args=[self.old_post.pk])
+        rank = Post.objects.get(pk=self.old_post.pk).popularity
+        self.guest_client.get(url)
+        self.old_post.refresh_from_db()
+        self.assertEqual(self.old_post.popularity, rank)
+        self.guest_client.get(url)
+        self.old_post.refresh_from_db()
+        self.assertGreater(self.old_post.popularity, rank)
+
+    def test_not_modified_is_not_a_view(self):
+        """Ответ 304 не считается просмотром"""
+        url = reverse(POST_DETAIL_URL_NAME, args=[self.old_post.pk])
+        etag = self.guest_client.get(url)['ETag']
+        with mock.patch('posts.popularity.record_view') as record_view:
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        record_view.assert_not_called()
+
+    @mock.patch('posts.popularity.VIEW_BATCH', 1)
+    def test_popular_bump_is_rate_limited(self):
+        """Просмотры сбрасывают /popular/ сразу, а затем не чаще
+        раза в POPULAR_BUMP_INTERVAL
+        """
+        scopes = [page_cache.POPULAR_SCOPE]
+        url = reverse(POST_DETAIL_URL_NAME, args=[self.old_post.pk])
+        first = page_cache.get_versions(scopes)
+        self.guest_client.get(url)
+        second = page_cache.get_versions(scopes)
+        self.assertNotEqual(first, second)
+        rank = Post.objects.get(pk=self.old_post.pk).popularity
+        for _ in range(2):
+            self.guest_client.get(url)
+        self.assertGreater(
+            Post.objects.get(pk=self.old_post.pk).popularity, rank)
+        self.assertEqual(page_cache.get_versions(scopes), second)
+        self.assertEqual(
+            Job.objects.filter(name=BUMP_POPULAR_TASK).count(), 1)
+        self.assertEqual(run_pending(), 0)
+        # отложенная задача дождалась конца интервала
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending(), 1)
+        self.assertNotEqual(page_cache.get_versions(scopes), second)
+
+    def test_cursor_pages(self):
+        """Курсор продолжает ленту с того же места рейтинга"""
+        Post.objects.bulk_create(
+            Post(author=self.user_author, text=f'Post {number}')
+            for number in range(POSTS_PER_PAGE)
+        )
+        recount_popularity()
+        ranked = list(Post.objects.order_by('-popularity', '-id'))
+        response = self.guest_client.get(reverse(POPULAR_URL_NAME))
+        first_page = response.context['page_obj']
+        self.assertEqual(list(first_page), ranked[:POSTS_PER_PAGE])
+        response = self.guest_client.get(
+            reverse(POPULAR_URL_NAME) + '?cursor=' + first_page.next_cursor)
+        self.assertEqual(
+            list(response.context['page_obj']), ranked[POSTS_PER_PAGE:])
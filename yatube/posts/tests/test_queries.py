@@ -0,0 +1,188 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.query_guard import assert_max_queries, assert_queries_do_not_scale
+from posts import urls as posts_urls
+from posts.counters import recount_author_stats
+from posts.models import Comment, Follow, Group, Post
+from posts.timeline import rebuild_feeds
+from posts.utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+# бюджеты SQL-запросов на один запрос к view без кеша страниц;
+# для авторизованного пользователя включают чтение сессии и пользователя,
+# для изменяющих view - SAVEPOINT/RELEASE транзакции
+VIEW_QUERY_BUDGETS = {
+    'posts:main': 1,
+    'posts:popular': 1,
+    'posts:group_list': 2,
+    'posts:profile': 6,
+    'posts:post_detail': 3,
+    'posts:post_comments': 2,
+    'posts:post_create': 5,
+    'posts:post_edit': 6,
+    'posts:add_comment': 12,
+    'posts:follow_index': 4,
+    'posts:search': 2,
+    'posts:profile_follow': 6,
+    'posts:profile_unfollow': 10,
+    'posts:page_cache_stats': 2,
+    'posts:index_rss': 1,
+    'posts:index_atom': 1,
+    'posts:group_rss': 2,
+    'posts:group_atom': 2,
+    'posts:profile_rss': 3,
+    'posts:profile_atom': 3,
+}
+
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+# без кеша страниц и фрагментов меряется полный путь рендера
+@override_settings(CACHES=DUMMY_CACHES)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.user = User.objects.create_user(username='test_user')
+        cls.admin = User.objects.create_user(
+            username='test_admin', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user_author,
+            group=cls.group,
+            text='Тестовый текст поста'
+        )
+        Follow.objects.create(user=cls.user, author=cls.user_author)
+        # счётчики создаются лениво, бюджеты считаются для готовых
+        recount_author_stats()
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.user_author)
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def add_posts(self):
+        Post.objects.bulk_create(
+            Post(
+                author=self.user_author,
+                group=self.group,
+                text=f'Тестовый текст поста {i}'
+            )
+            for i in range(POSTS_PER_PAGE)
+        )
+        # bulk_create обходит сигналы, поэтому ленту пересобираем сами
+        rebuild_feeds()
+
+    def add_comments(self):
+        for i in range(POSTS_PER_PAGE):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'commenter_{i}'),
+                text=f'Комментарий {i}'
+            )
+
+    def view_requests(self):
+        """Запросы к каждому view: (имя маршрута, клиент, метод, адрес)"""
+        post_id = self.post.pk
+        username = self.user_author.username
+        return [
+            ('posts:main', self.guest_client, 'get', reverse('posts:main')),
+            ('posts:popular', self.guest_client, 'get',
+             reverse('posts:popular')),
+            ('posts:group_list', self.guest_client, 'get',
+             reverse('posts:group_list', args=[self.group.slug])),
+            ('posts:profile', self.authorized_client, 'get',
+             reverse('posts:profile', args=[username])),
+            ('posts:post_detail', self.guest_client, 'get',
+             reverse('posts:post_detail', args=[post_id])),
+            ('posts:post_comments', self.guest_client, 'get',
+             reverse('posts:post_comments', args=[post_id])),
+            ('posts:post_create', self.authorized_client, 'get',
+             reverse('posts:post_create')),
+            ('posts:post_edit', self.author_client, 'get',
+             reverse('posts:post_edit', args=[post_id])),
+            ('posts:add_comment', self.authorized_client, 'post',
+             reverse('posts:add_comment', args=[post_id])),
+            ('posts:follow_index', self.authorized_client, 'get',
+             reverse('posts:follow_index')),
+            ('posts:search', self.guest_client, 'get',
+             reverse('posts:search') + '?q=текст'),
+            ('posts:profile_follow', self.authorized_client, 'get',
+             reverse('posts:profile_follow', args=[username])),
+            ('posts:profile_unfollow', self.authorized_client, 'get',
+             reverse('posts:profile_unfollow', args=[username])),
+            ('posts:page_cache_stats', self.admin_client, 'get',
+             reverse('posts:page_cache_stats')),
+            *(
+                (f'posts:{name}', self.guest_client, 'get',
+                 reverse(f'posts:{name}', args=args))
+                for name, args in (
+                    ('index_rss', []),
+                    ('index_atom', []),
+                    ('group_rss', [self.group.slug]),
+                    ('group_atom', [self.group.slug]),
+                    ('profile_rss', [username]),
+                    ('profile_atom', [username]),
+                )
+            ),
+        ]
+
+    def test_every_view_has_budget(self):
+        """У каждого маршрута posts есть бюджет запросов"""
+        names = {
+            f'{posts_urls.app_name}:{pattern.name}'
+            for pattern in posts_urls.urlpatterns
+        }
+        self.assertEqual(names, set(VIEW_QUERY_BUDGETS))
+        self.assertEqual(
+            {name for name, *_ in self.view_requests()}, names)
+
+    def test_views_within_budget(self):
+        """Ни один view не выходит за свой бюджет запросов"""
+        for name, client, method, url in self.view_requests():
+            with self.subTest(view=name):
+                with assert_max_queries(VIEW_QUERY_BUDGETS[name], name):
+                    getattr(client, method)(
+                        url, {'text': 'Новый комментарий'}
+                        if method == 'post' else None)
+
+    def test_listings_do_not_scale_with_page_size(self):
+        """Число запросов на листингах не зависит от числа постов"""
+        listings = [
+            ('posts:main', self.guest_client, reverse('posts:main')),
+            ('posts:popular', self.guest_client, reverse('posts:popular')),
+            ('posts:group_list', self.guest_client,
+             reverse('posts:group_list', args=[self.group.slug])),
+            ('posts:profile', self.authorized_client,
+             reverse('posts:profile', args=[self.user_author.username])),
+            ('posts:follow_index', self.authorized_client,
+             reverse('posts:follow_index')),
+            ('posts:search', self.guest_client,
+             reverse('posts:search') + '?q=текст'),
+        ]
+        for name, client, url in listings:
+            with self.subTest(view=name):
+                Post.objects.exclude(pk=self.post.pk).delete()
+                assert_queries_do_not_scale(
+                    lambda: client.get(url), self.add_posts, name)
+
+    def test_comments_do_not_scale(self):
+        """Число запросов страницы поста не зависит от числа комментариев"""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        assert_queries_do_not_scale(
+            lambda: self.guest_client.get(url), self.add_comments,
+            'posts:post_detail')
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.const import SEARCH_URL_NAME
+from posts.models import Post
+from posts.search import SearchPaginator
+
+User = get_user_model()
+
+SEARCH_RESULTS_IN_TEST_DB = 13
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.post = Post.objects.create(
+            author=cls.user_author,
+            text='Котики захватили интернет'
+        )
+        cls.search_url = reverse(SEARCH_URL_NAME)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query):
+        response = self.guest_client.get(self.search_url, {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при создании, правке и удалении поста"""
+        self.assertEqual(self.search('котики'), [self.post])
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Собаки захватили интернет'
+        post.save()
+        self.assertEqual(self.search('котики'), [])
+        self.assertEqual(self.search('собаки'), [post])
+        post.delete()
+        self.assertEqual(self.search('собаки'), [])
+
+    def test_query_syntax_is_escaped(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск"""
+        self.assertEqual(self.search('"котики" AND (NEAR*'), [])
+        self.assertEqual(self.search('котики*'), [self.post])
+        self.assertEqual(self.search('***'), [])
+
+    def test_ranking(self):
+        """Более релевантный пост выше в выдаче"""
+        relevant = Post.objects.create(
+            author=self.user_author,
+            text='котики котики котики'
+        )
+        self.assertEqual(self.search('котики'), [relevant, self.post])
+
+    def test_cursor_paging(self):
+        """Результаты листаются курсором вперёд и назад без повторов"""
+        Post.objects.bulk_create(
+            Post(author=self.user_author, text=f'интернет {i}')
+            for i in range(SEARCH_RESULTS_IN_TEST_DB - 1)
+        )
+        first_page = SearchPaginator('интернет').get_page()
+        second_page = SearchPaginator('интернет').get_page(
+            first_page.next_cursor)
+        self.assertFalse(second_page.has_next())
+        found = list(first_page) + list(second_page)
+        self.assertEqual(len(found), SEARCH_RESULTS_IN_TEST_DB)
+        self.assertEqual(len(set(found)), SEARCH_RESULTS_IN_TEST_DB)
+        back = SearchPaginator('интернет').get_page(
+            second_page.previous_cursor)
+        self.assertEqual(list(back), list(first_page))
+
+    def test_admin_search(self):
+        """Поиск в админке идёт по полнотекстовому индексу"""
+        admin_client = Client()
+        admin_client.force_login(self.admin)
+        response = admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котики'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.post])
@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import run_pending
+from jobs.models import Job
+from posts.const import POST_EDIT_URL_NAME
+from posts.models import Post, StoredImage
+from posts.storage import post_image_storage
+from posts.thumbnails import generate_thumbnails, ready_picture
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+def upload(name):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentHashStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='test_auth')
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user, text='Post with image', image=upload(name))
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые загрузки делят файл и миниатюры"""
+        first = self.create_post('meme.gif')
+        second = self.create_post('Meme copy.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertTrue(first.image.name.endswith('.gif'))
+        _, files = post_image_storage.listdir(
+            first.image.name.rsplit('/', 1)[0])
+        self.assertEqual(len(files), 1)
+        generate_thumbnails(first.image.name)
+        self.assertIsNotNone(ready_picture(second.image))
+
+    def test_file_is_deleted_with_last_reference(self):
+        """Файл и миниатюры удаляются вместе с последней ссылкой"""
+        first = self.create_post('meme.gif')
+        second = self.create_post('meme.gif')
+        name = first.image.name
+        generate_thumbnails(name)
+        thumbnail = default.kvstore.get_variants(
+            ImageFile(first.image))[0]['name']
+        first.delete()
+        run_pending()
+        self.assertTrue(post_image_storage.exists(name))
+        self.assertTrue(default.storage.exists(thumbnail))
+        # то же содержимое с другим расширением - другой файл
+        second.image = upload('meme.png')
+        second.save()
+        self.assertNotEqual(second.image.name, name)
+        self.assertTrue(post_image_storage.exists(name))
+        run_pending()
+        self.assertFalse(post_image_storage.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+        self.assertFalse(default.storage.exists(thumbnail))
+        self.assertIsNone(ready_picture(first.image))
+
+    def test_pending_upload_keeps_file(self):
+        """Загрузка того же файла, чей пост ещё не сохранён, не даёт
+        удалить файл
+        """
+        post = self.create_post('meme.gif')
+        name = post.image.name
+        post.delete()
+        # параллельная загрузка: файл уже сохранён, поста ещё нет
+        self.assertEqual(
+            post_image_storage.save('posts/x.gif', upload('x.gif')), name)
+        run_pending()
+        self.assertTrue(post_image_storage.exists(name))
+        self.assertEqual(StoredImage.objects.get(name=name).references, 1)
+
+    def test_existing_file_respects_max_length(self):
+        """Имя уже сохранённого файла тоже проверяется на длину"""
+        name = self.create_post('meme.gif').image.name
+        with self.assertRaises(SuspiciousFileOperation):
+            post_image_storage.save(
+                name, upload('meme.gif'), max_length=len(name) - 1)
+
+    def test_failed_edit_keeps_reference(self):
+        """Если правка поста упала, ссылка на старую картинку остаётся"""
+        post = self.create_post('meme.gif')
+        name = post.image.name
+        Job.objects.all().delete()
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch(
+            'posts.views.schedule_thumbnails', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            client.post(
+                reverse(POST_EDIT_URL_NAME, args=[post.pk]),
+                data={'text': post.text, 'image': upload('meme.png')}
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        self.assertEqual(StoredImage.objects.get(name=name).references, 1)
+        self.assertFalse(Job.objects.exists())
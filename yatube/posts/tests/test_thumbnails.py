@@ -0,0 +1,236 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.models import KVStore as KVStoreModel
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from jobs.models import Job
+from jobs.queue import run_pending
+from posts.kvstore import (
+    STATS_CACHED,
+    STATS_DB,
+    STATS_SINGLE,
+    clear_prefetched,
+)
+from posts.const import (
+    POST_CREATE_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    POST_EDIT_URL_NAME,
+)
+from posts.models import Post
+from posts.thumbnails import (
+    GENERATE_THUMBNAILS_TASK,
+    IMAGE_FORMATS,
+    POST_IMAGE_WIDTHS,
+    generate_thumbnails,
+    prefetch_thumbnails,
+    ready_picture,
+)
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user_author)
+        self.post = Post.objects.create(
+            author=self.user_author,
+            text='Post with image',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif')
+        )
+
+    def replace_image(self, width):
+        buffer = BytesIO()
+        Image.new('RGB', (width, 600), 'red').save(buffer, 'PNG')
+        self.post.image = SimpleUploadedFile(
+            name='wide.png', content=buffer.getvalue(),
+            content_type='image/png')
+        self.post.save()
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """До генерации миниатюры показывается заглушка"""
+        url = reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.pk})
+        self.assertIsNone(ready_picture(self.post.image))
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Изображение обрабатывается')
+        generate_thumbnails(self.post.image.name, self.post.pk)
+        picture = ready_picture(self.post.image)
+        self.assertIsNotNone(picture)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, picture['src'])
+
+    def test_miss_is_not_cached(self):
+        """Миниатюры, созданные другим процессом, видны сразу:
+        промах не запоминается в кэше
+        """
+        source = ImageFile(self.post.image)
+        key = default.kvstore.variants_key(source)
+        generate_thumbnails(self.post.image.name)
+        value = KVStoreModel.objects.get(key=key).value
+        default.kvstore.delete_variants(source)
+        self.assertIsNone(ready_picture(self.post.image))
+        self.assertIsNone(default.kvstore.cache.get(key))
+        # другой процесс пишет в БД и в свой кэш, но не в наш
+        KVStoreModel.objects.create(key=key, value=value)
+        self.assertIsNotNone(ready_picture(self.post.image))
+
+    def test_responsive_variants(self):
+        """Картинка отдаётся набором ширин в WebP с запасным JPEG"""
+        self.assertIn('WEBP', IMAGE_FORMATS)
+        self.replace_image(max(POST_IMAGE_WIDTHS))
+        generate_thumbnails(self.post.image.name, self.post.pk)
+        picture = ready_picture(self.post.image)
+        self.assertEqual(
+            [source['type'] for source in picture['sources']],
+            [f'image/{name.lower()}' for name in IMAGE_FORMATS])
+        for srcset in (picture['srcset'], picture['sources'][-1]['srcset']):
+            self.assertEqual(
+                [item.split()[1] for item in srcset.split(', ')],
+                [f'{width}w' for width in POST_IMAGE_WIDTHS])
+        self.assertTrue(picture['srcset'].endswith('1440w'))
+        response = self.authorized_client.get(reverse(
+            POST_DETAIL_URL_NAME, kwargs={'post_id': self.post.pk}))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, f'srcset="{picture["srcset"]}"')
+
+    def test_srcset_skips_widths_above_source(self):
+        """В srcset нет ширин больше исходника"""
+        self.replace_image(POST_IMAGE_WIDTHS[-1] - 1)
+        generate_thumbnails(self.post.image.name, self.post.pk)
+        picture = ready_picture(self.post.image)
+        self.assertEqual(
+            [item.split()[1] for item in picture['srcset'].split(', ')],
+            [f'{width}w' for width in POST_IMAGE_WIDTHS[:-1]])
+
+    def test_small_image_is_not_upscaled(self):
+        """Картинка уже самой узкой ширины получает один вариант
+        своего размера
+        """
+        generate_thumbnails(self.post.image.name, self.post.pk)
+        picture = ready_picture(self.post.image)
+        self.assertEqual((picture['width'], picture['height']), (1, 1))
+        self.assertEqual(picture['srcset'].split()[1], '1w')
+        for source in picture['sources']:
+            self.assertEqual(len(source['srcset'].split(', ')), 1)
+
+    def test_post_create_schedules_generation(self):
+        """Создание поста с картинкой ставит генерацию в очередь задач"""
+        self.authorized_client.post(
+            reverse(POST_CREATE_URL_NAME),
+            data={
+                'text': 'New post',
+                'image': SimpleUploadedFile(
+                    name='new.gif',
+                    content=SMALL_GIF + b'\x00',
+                    content_type='image/gif'
+                )
+            }
+        )
+        post = Post.objects.get(text='New post')
+        self.assertTrue(Job.objects.filter(
+            name=GENERATE_THUMBNAILS_TASK, status=Job.QUEUED).exists())
+        self.assertIsNone(ready_picture(post.image))
+        run_pending()
+        self.assertIsNotNone(ready_picture(post.image))
+
+    def test_failed_edit_enqueues_nothing(self):
+        """Генерация для новой картинки ставится в очередь в одной
+        транзакции с правкой: если правка упала, задачи нет
+        """
+        Job.objects.all().delete()
+        with mock.patch(
+            'posts.views.redirect', side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.authorized_client.post(
+                reverse(POST_EDIT_URL_NAME, args=[self.post.pk]),
+                data={
+                    'text': self.post.text,
+                    'image': SimpleUploadedFile(
+                        name='new.gif',
+                        content=SMALL_GIF + b'\x00',
+                        content_type='image/gif'
+                    )
+                }
+            )
+        self.assertFalse(Job.objects.exists())
+
+    def test_backfill_command(self):
+        """Команда generate_thumbnails обходит все картинки постов"""
+        Post.objects.create(author=self.user_author, text='No image')
+        with mock.patch(
+            'posts.management.commands.generate_thumbnails.'
+            'generate_thumbnails_in_worker'
+        ) as generate:
+            call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        generate.assert_called_once_with(self.post.image.name)
+
+    def test_prefetch_reads_page_in_one_round_trip(self):
+        """Варианты картинок страницы читаются одним запросом к БД,
+        а после - одним обращением к общему кэшу
+        """
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user_author,
+                text=f'Post {i}',
+                image=SimpleUploadedFile(
+                    name=f'{i}.gif',
+                    content=SMALL_GIF + bytes([i]),
+                    content_type='image/gif'
+                )
+            )
+            for i in range(3)
+        ]
+        for post in posts:
+            generate_thumbnails(post.image.name)
+        default.kvstore.cache.clear()
+        self.addCleanup(clear_prefetched)
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts)
+            pictures = [ready_picture(post.image) for post in posts]
+        self.assertNotIn(None, pictures)
+        with self.assertNumQueries(0):
+            prefetch_thumbnails(posts)
+            for post in posts:
+                ready_picture(post.image)
+        self.assertEqual(default.kvstore.get_stats(), {
+            STATS_CACHED: len(posts),
+            STATS_DB: len(posts),
+            STATS_SINGLE: 0,
+        })
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.const import FOLLOW_INDEX_URL_NAME
+from posts.models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.user_follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(
+            author=cls.user_author,
+            text='Old post text'
+        )
+        cls.follow_index_url = reverse(FOLLOW_INDEX_URL_NAME)
+
+    def setUp(self):
+        self.follower_client = Client()
+        self.follower_client.force_login(self.user_follower)
+        cache.clear()
+
+    def feed_posts(self):
+        return list(
+            Post.objects.filter(feed_entries__user=self.user_follower)
+        )
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора"""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        self.assertEqual(self.feed_posts(), [self.old_post])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков, но не автора"""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        new_post = Post.objects.create(
+            author=self.user_author,
+            text='New post text'
+        )
+        self.assertIn(new_post, self.feed_posts())
+        self.assertFalse(self.user_author.feed_entries.exists())
+
+    def test_unfollow_clears_feed(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        Follow.objects.filter(
+            user=self.user_follower, author=self.user_author).delete()
+        self.assertEqual(self.feed_posts(), [])
+
+    def test_feed_is_capped(self):
+        """В ленте хранится не больше FEED_MAX_ENTRIES записей"""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        with mock.patch('posts.timeline.FEED_MAX_ENTRIES', 2):
+            newest = [
+                Post.objects.create(author=self.user_author, text=str(i))
+                for i in range(3)
+            ]
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.user_follower).count(), 2)
+        self.assertEqual(set(self.feed_posts()), set(newest[1:]))
+
+    def test_follow_index_reads_timeline(self):
+        """Лента /follow/ строится из записей ленты"""
+        Follow.objects.create(user=self.user_follower, author=self.user_author)
+        response = self.follower_client.get(self.follow_index_url)
+        self.assertEqual(list(response.context['page_obj']), [self.old_post])
@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.const import POST_CREATE_URL_NAME, POST_EDIT_URL_NAME
+from posts.models import Post
+from posts.uploads import ERROR_TOO_MANY_PIXELS
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# тег ориентации EXIF: повернуть на 90° по часовой стрелке
+ORIENTATION_TAG = 0x0112
+ROTATE_90_CW = 6
+
+
+def image_upload(name, size, image_format='JPEG', **save_options):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format, **save_options)
+    return SimpleUploadedFile(
+        name=name,
+        content=buffer.getvalue(),
+        content_type=Image.MIME[image_format]
+    )
+
+
+def animation_upload(name, size, frames=2, **save_options):
+    buffer = BytesIO()
+    images = [
+        Image.new('RGB', size, color)
+        for color in ('red', 'blue', 'green')[:frames]
+    ]
+    images[0].save(
+        buffer, 'GIF', save_all=True, append_images=images[1:],
+        duration=50, loop=0, **save_options
+    )
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user_author)
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse(POST_CREATE_URL_NAME),
+            data={'text': 'Post with image', 'image': image}
+        )
+
+    @mock.patch('posts.uploads.POST_IMAGE_MAX_SIDE', 100)
+    def test_exif_is_stripped_and_image_downscaled(self):
+        """EXIF снимается, картинка поворачивается и уменьшается"""
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = ROTATE_90_CW
+        self.create_post(image_upload('photo.jpg', (300, 150), exif=exif))
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (50, 100))
+            self.assertNotIn('exif', stored.info)
+
+    def test_clean_image_is_stored_as_is(self):
+        """Картинка без метаданных и в пределах размеров не пересохраняется"""
+        upload = image_upload('small.png', (30, 20), 'PNG')
+        self.create_post(upload)
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (30, 20))
+        with open(post.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), upload.file.getvalue())
+
+    @mock.patch('posts.uploads.POST_IMAGE_MAX_SIDE', 100)
+    def test_animation_is_stripped_and_downscaled(self):
+        """Анимация пересохраняется покадрово без комментария"""
+        self.create_post(
+            animation_upload('anim.gif', (300, 150), comment=b'secret'))
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (100, 50))
+            self.assertEqual(stored.n_frames, 2)
+            self.assertNotIn('comment', stored.info)
+
+    @mock.patch('posts.uploads.POST_IMAGE_MAX_PIXELS', 1000)
+    def test_animation_pixels_counted_over_frames(self):
+        """Предел пикселей считается по всем кадрам анимации"""
+        response = self.create_post(
+            animation_upload('anim.gif', (20, 20), frames=3))
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image',
+            ERROR_TOO_MANY_PIXELS.format(limit=0))
+
+    @mock.patch('posts.uploads.POST_IMAGE_MAX_BYTES', 100)
+    def test_too_many_bytes(self):
+        """Слишком большой файл отбрасывается ещё при приёме запроса"""
+        with mock.patch('posts.forms.process_image') as process:
+            response = self.create_post(
+                image_upload('big.png', (100, 100), 'PNG'))
+        process.assert_not_called()
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(response.context['form'].has_error('image'))
+
+    @mock.patch('posts.uploads.POST_IMAGE_MAX_PIXELS', 100)
+    def test_too_many_pixels(self):
+        response = self.create_post(image_upload('wide.jpg', (20, 20)))
+        self.assertFalse(Post.objects.exists())
+        self.assertFormError(
+            response, 'form', 'image',
+            ERROR_TOO_MANY_PIXELS.format(limit=0))
+
+    def test_edit_updates_dimensions(self):
+        """Замена и удаление картинки обновляют её размеры"""
+        self.create_post(image_upload('first.png', (30, 20), 'PNG'))
+        post = Post.objects.get()
+        url = reverse(POST_EDIT_URL_NAME, args=[post.pk])
+        self.authorized_client.post(url, data={
+            'text': post.text,
+            'image': image_upload('second.png', (40, 10), 'PNG'),
+        })
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (40, 10))
+        self.authorized_client.post(
+            url, data={'text': post.text, 'image-clear': 'on'})
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertIsNone(post.image_width)
@@ -5,9 +5,11 @@ from django import forms
 from django.urls import reverse
 from django.conf import settings
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from posts.utils import POSTS_PER_PAGE
+from posts.utils import COMMENTS_PER_PAGE, POSTS_PER_PAGE
 from django.test import (
     TestCase,
     Client,
@@ -26,6 +28,7 @@ from posts.const import (
     POST_DETAIL_TEMPLATE,
     GROUP_LIST_TEMPLATE,
     FOLLOW_INDEX_TEMPLATE,
+    COMMENT_LIST_TEMPLATE,
 
     INDEX_URL_NAME,
     PROFILE_URL_NAME,
@@ -37,6 +40,7 @@ from posts.const import (
     FOLLOW_INDEX_URL_NAME,
     PROFILE_FOLLOW_URL_NAME,
     PROFILE_UNFOLLOW_URL_NAME,
+    POST_COMMENTS_URL_NAME,
 )
 
 
@@ -163,8 +167,8 @@ class PostPagesTests(TestCase):
             response.context.get('posts_count'),
             self.post.author.posts.count())
         self.assertEqual(
-            response.context.get('comments').first(),
-            self.comment
+            list(response.context.get('comments')),
+            [self.comment]
         )
 
     def test_post_create_check_context(self):
@@ -226,13 +230,55 @@ class PostPagesTests(TestCase):
             text='Test cache',
         )
         response_1 = self.authorized_client_author.get(self.index_url)
-        post.delete()
         response_2 = self.authorized_client_author.get(self.index_url)
         self.assertEqual(response_1.content, response_2.content)
-        cache.clear()
+        self.assertIsNone(response_2.context)
+        post.delete()
         response_3 = self.authorized_client_author.get(self.index_url)
         self.assertNotEqual(response_1.content, response_3.content)
 
+    def test_cache_invalidated_by_events(self):
+        """Страницы постов сбрасываются при изменении их данных"""
+        pages = [
+            self.index_url,
+            self.group_list_url,
+            self.profile_url,
+            self.post_detail_url,
+        ]
+        for url in pages:
+            self.authorized_client_author.get(url)
+        Comment.objects.create(
+            author=self.user,
+            post=self.post,
+            text='New comment'
+        )
+        for url in pages:
+            with self.subTest(url=url):
+                response = self.authorized_client_author.get(url)
+                self.assertIsNotNone(response.context)
+
+    def test_post_card_fragment_invalidation(self):
+        """Карточка поста обновляется при правке поста и имени автора"""
+        self.authorized_client_author.get(self.group_list_url)
+        author = User.objects.get(pk=self.user_author.pk)
+        author.first_name = 'Fragment'
+        author.last_name = 'Author'
+        author.save()
+        response = self.authorized_client_author.get(self.group_list_url)
+        self.assertContains(response, 'Fragment Author')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Edited fragment text'
+        post.save()
+        response = self.authorized_client_author.get(self.group_list_url)
+        self.assertContains(response, 'Edited fragment text')
+
+    def test_cache_variants(self):
+        """Гость и авторизованный пользователь получают разные страницы"""
+        guest_response = Client().get(self.index_url)
+        author_response = self.authorized_client_author.get(self.index_url)
+        self.assertIsNotNone(author_response.context)
+        self.assertNotEqual(guest_response.content, author_response.content)
+
     def test_follow_unfollow(self):
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -317,3 +363,110 @@ class PaginatorTest(TestCase):
         for url in templates_urls:
             response = self.guest_client.get(url + '?page=2')
             self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_pages_match_numbered_pages(self):
+        """Проверка: курсорная пагинация отдаёт те же посты,
+        что и ?page=N, и позволяет вернуться назад
+        """
+        templates_urls = [
+            self.index_url,
+            self.profile_url,
+            self.group_list_url
+        ]
+        for url in templates_urls:
+            with self.subTest(url=url):
+                first_page = self.guest_client.get(url).context['page_obj']
+                second_page = self.guest_client.get(
+                    url + '?page=2').context['page_obj']
+                response = self.guest_client.get(
+                    url + '?cursor=' + first_page.next_cursor)
+                cursor_page = response.context['page_obj']
+                self.assertEqual(list(cursor_page), list(second_page))
+                self.assertFalse(cursor_page.has_next())
+                self.assertTrue(cursor_page.has_previous())
+                response = self.guest_client.get(
+                    url + '?cursor=' + cursor_page.previous_cursor)
+                previous_page = response.context['page_obj']
+                self.assertEqual(list(previous_page), list(first_page))
+                self.assertFalse(previous_page.has_previous())
+
+    def test_cursor_page_skips_count(self):
+        """Проверка: ни первая, ни курсорная страница не выполняют COUNT"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(self.group_list_url)
+        first_page = response.context['page_obj']
+        cursor_url = self.group_list_url + '?cursor=' + first_page.next_cursor
+        with CaptureQueriesContext(connection) as cursor_queries:
+            self.guest_client.get(cursor_url)
+        captured = queries.captured_queries + cursor_queries.captured_queries
+        for query in captured:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_pagination_has_no_page_numbers(self):
+        """Проверка: в навигации нет ссылок на номера страниц"""
+        response = self.guest_client.get(self.index_url)
+        self.assertNotContains(response, '?page=')
+        self.assertContains(response, 'cursor=')
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверка: испорченный курсор ведёт на первую страницу"""
+        response = self.guest_client.get(self.index_url + '?cursor=broken')
+        self.assertEqual(len(response.context['page_obj']), POSTS_PER_PAGE)
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(username='test_auth')
+        cls.post = Post.objects.create(
+            author=cls.user_author,
+            text='Тестовый текст поста'
+        )
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user_author, text=f'Комм {i}')
+            for i in range(COMMENTS_PER_PAGE + 3)
+        )
+        cls.comments = list(Comment.objects.order_by('created', 'id'))
+        cls.post_detail_url = reverse(
+            POST_DETAIL_URL_NAME, kwargs={'post_id': cls.post.pk})
+        cls.post_comments_url = reverse(
+            POST_COMMENTS_URL_NAME, kwargs={'post_id': cls.post.pk})
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_post_detail_shows_first_comments_page(self):
+        """На странице поста только первая страница комментариев"""
+        response = self.guest_client.get(self.post_detail_url)
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.comments[:COMMENTS_PER_PAGE])
+        self.assertContains(
+            response,
+            f'{self.post_comments_url}?cursor={comments.next_cursor}')
+
+    def test_comments_fragment_continues_from_cursor(self):
+        """Фрагмент отдаёт следующие комментарии без разметки страницы"""
+        first_page = self.guest_client.get(
+            self.post_detail_url).context['comments']
+        response = self.guest_client.get(
+            self.post_comments_url, {'cursor': first_page.next_cursor})
+        self.assertTemplateUsed(response, COMMENT_LIST_TEMPLATE)
+        self.assertTemplateNotUsed(response, 'base.html')
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.comments[COMMENTS_PER_PAGE:])
+        self.assertFalse(comments.has_next())
+        self.assertNotContains(response, 'data-comments-more')
+
+    def test_comments_page_size_does_not_depend_on_total(self):
+        """Запрос комментариев ограничен размером страницы"""
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(self.post_detail_url)
+        comment_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "posts_comment"' in query['sql']
+        ]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn(f'LIMIT {COMMENTS_PER_PAGE + 1}', comment_queries[0])
+        self.assertIn('INNER JOIN "auth_user"', comment_queries[0])
@@ -0,0 +1,219 @@
+import logging
+import os
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from PIL import Image
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import enqueue
+from .models import Post, StoredImage
+from .page_cache import bump_post
+from .storage import post_image_storage
+
+logger = logging.getLogger(__name__)
+
+# ширины вариантов картинки поста для srcset; пропорции как у 960x339
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+POST_IMAGE_FALLBACK_WIDTH = 960
+POST_IMAGE_RATIO = 339 / 960
+# маленькие картинки не растягиваем: лишние байты без новых деталей
+POST_IMAGE_OPTIONS = {'crop': 'center', 'upscale': False}
+# ширина картинки на странице: контейнер bootstrap или весь экран
+POST_IMAGE_SIZES = '(min-width: 1200px) 1110px, 100vw'
+# форматы в порядке предпочтения браузером; JPEG - запасной вариант
+FALLBACK_FORMAT = 'JPEG'
+MODERN_FORMATS = ('AVIF', 'WEBP')
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+# количество потоков команды generate_thumbnails
+THUMBNAIL_WORKERS = 2
+GENERATE_THUMBNAILS_TASK = 'posts.generate_thumbnails'
+RELEASE_IMAGE_TASK = 'posts.release_image'
+
+
+def supported_formats():
+    """Современные форматы, которые умеет сохранять установленный Pillow"""
+    Image.init()
+    formats = tuple(name for name in MODERN_FORMATS if name in Image.SAVE)
+    # sorl-thumbnail не знает расширения AVIF
+    EXTENSIONS.setdefault('AVIF', 'avif')
+    return formats
+
+
+def image_geometry(width):
+    return f'{width}x{round(width * POST_IMAGE_RATIO)}'
+
+
+def image_variants(image_format):
+    return [
+        (width, image_geometry(width),
+         {**POST_IMAGE_OPTIONS, 'format': image_format})
+        for width in POST_IMAGE_WIDTHS
+    ]
+
+
+IMAGE_FORMATS = supported_formats()
+# все варианты картинки поста: (формат, ширина, геометрия, опции sorl)
+POST_IMAGE_VARIANTS = tuple(
+    (image_format, width, geometry, options)
+    for image_format in (FALLBACK_FORMAT, *IMAGE_FORMATS)
+    for width, geometry, options in image_variants(image_format)
+)
+
+
+def source_width(name):
+    """Ширина исходника по заголовку файла, без декодирования"""
+    with post_image_storage.open(name) as file_:
+        return Image.open(file_).width
+
+
+def generate_thumbnails(name, post_id=None):
+    """Создаёт миниатюры картинки, уже готовые пропускает.
+
+    Ширины больше исходника не создаются: без увеличения они дали бы
+    ту же картинку под другим именем. Самая узкая ширина создаётся
+    всегда, чтобы у маленькой картинки был хоть один вариант.
+    Список готовых вариантов сохраняется в KV-хранилище, откуда его
+    читает ready_picture. Если передан post_id, сбрасывает кэш страниц
+    с заглушкой вместо картинки этого поста. Ошибки не глушатся:
+    очередь задач повторит генерацию.
+    """
+    # хранилище поля входит в ключ sorl, поэтому указываем его явно
+    source = ImageFile(name, post_image_storage)
+    max_width = max(source_width(name), POST_IMAGE_WIDTHS[0])
+    variants = []
+    for image_format, width, geometry, options in POST_IMAGE_VARIANTS:
+        if width > max_width:
+            continue
+        thumbnail = get_thumbnail(source, geometry, **options)
+        variants.append({
+            'format': image_format,
+            'name': thumbnail.name,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+        })
+    default.kvstore.set_variants(source, variants)
+    if post_id is not None:
+        post = Post.objects.filter(pk=post_id).values(
+            'author_id', 'group_id').first()
+        if post is not None:
+            bump_post(post_id, post['author_id'], {post['group_id']})
+
+
+def generate_thumbnails_in_worker(name, post_id=None):
+    """Запуск в потоке команды generate_thumbnails: ошибка одной картинки
+    не останавливает остальные, соединение с БД потока закрывается
+    """
+    try:
+        generate_thumbnails(name, post_id)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnails(post):
+    """Ставит генерацию миниатюр в очередь задач.
+
+    Задача создаётся в текущей транзакции: воркер увидит её после
+    коммита, а при откате она пропадёт вместе с постом.
+    """
+    if post.image:
+        enqueue(
+            GENERATE_THUMBNAILS_TASK,
+            image_name=post.image.name,
+            post_id=post.pk
+        )
+
+
+def release_image(name):
+    """Удаляет картинку и её миниатюры, если счётчик ссылок на неё
+    равен нулю: одинаковые загрузки хранятся одним файлом.
+
+    Строка счётчика удаляется условным DELETE, который ждёт блокировки
+    параллельной загрузки (см. posts.storage.add_reference), а файл -
+    в той же транзакции. При ошибке транзакция откатывается, и задача
+    повторяется.
+    """
+    with transaction.atomic():
+        if not StoredImage.objects.filter(
+            name=name, references=0
+        ).delete()[0]:
+            return
+        source = ImageFile(name, post_image_storage)
+        default.kvstore.delete_variants(source)
+        delete(source)
+
+
+def schedule_release_image(name):
+    """Снимает ссылку поста на файл и ставит его удаление в очередь"""
+    # файл вне MEDIA_ROOT хранилищу не принадлежит
+    if not name or os.path.isabs(name):
+        return
+    StoredImage.objects.filter(name=name).update(
+        references=Greatest(F('references') - 1, 0))
+    enqueue(RELEASE_IMAGE_TASK, image_name=name)
+
+
+def prefetch_thumbnails(posts):
+    """Читает из KV-хранилища готовые варианты картинок постов страницы
+    разом, чтобы ready_picture не ходил за каждой по отдельности
+    """
+    default.kvstore.prefetch_variants(
+        [ImageFile(post.image) for post in posts if post.image])
+
+
+def srcset(variants):
+    return ', '.join(
+        f'{default.storage.url(variant["name"])} {variant["width"]}w'
+        for variant in variants
+    )
+
+
+def ready_picture(file_):
+    """Готовые варианты картинки поста для <picture> или None.
+
+    Пока миниатюры не созданы, шаблон показывает заглушку.
+    """
+    if not file_:
+        return None
+    variants = default.kvstore.get_variants(ImageFile(file_))
+    if not variants:
+        return None
+    by_format = {}
+    for variant in variants:
+        by_format.setdefault(variant['format'], []).append(variant)
+    fallbacks = by_format[FALLBACK_FORMAT]
+    # старые браузеры получают вариант не шире POST_IMAGE_FALLBACK_WIDTH
+    fallback = max(
+        (
+            variant for variant in fallbacks
+            if variant['width'] <= POST_IMAGE_FALLBACK_WIDTH
+        ),
+        key=lambda variant: variant['width'],
+        default=fallbacks[0]
+    )
+    sources = [
+        {'type': MIME_TYPES[image_format], 'srcset': srcset(
+            by_format[image_format])}
+        for image_format in IMAGE_FORMATS if image_format in by_format
+    ]
+    picture_srcset = srcset(fallbacks)
+    return {
+        'src': default.storage.url(fallback['name']),
+        'width': fallback['width'],
+        'height': fallback['height'],
+        'sources': sources,
+        'srcset': picture_srcset,
+        'sizes': POST_IMAGE_SIZES,
+        # меняется, когда миниатюры пересоздаются
+        'key': ' '.join(
+            [picture_srcset, *(source['srcset'] for source in sources)]),
+    }
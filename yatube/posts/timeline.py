@@ -0,0 +1,83 @@
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+
+from .models import FeedEntry, Follow, Post
+
+# максимальное количество записей в ленте одного пользователя
+FEED_MAX_ENTRIES = 1000
+# размер пачки при массовой вставке записей ленты
+FEED_BATCH_SIZE = 500
+
+
+def trim_feeds(user_ids):
+    """Удаляет из лент пользователей записи сверх FEED_MAX_ENTRIES"""
+    cutoff = FeedEntry.objects.filter(
+        user=OuterRef('user')
+    ).order_by('-pub_date', '-id').values('pub_date')[
+        FEED_MAX_ENTRIES - 1:FEED_MAX_ENTRIES
+    ]
+    FeedEntry.objects.filter(user__in=user_ids).annotate(
+        cutoff=Subquery(cutoff)
+    ).filter(pub_date__lt=F('cutoff')).delete()
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты подписчиков автора"""
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    if not follower_ids:
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim_feeds(follower_ids)
+
+
+def backfill_feed(user_id, author_id):
+    """Добавляет в ленту пользователя последние посты нового автора"""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[:FEED_MAX_ENTRIES]
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+    trim_feeds([user_id])
+
+
+def remove_author_from_feed(user_id, author_id):
+    """Убирает из ленты пользователя посты автора, от которого он отписался"""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild_feeds():
+    """Пересобирает ленты всех пользователей одним INSERT ... SELECT.
+
+    Нужна после массовых вставок в обход сигналов (bulk_create).
+    """
+    entry_table = FeedEntry._meta.db_table
+    FeedEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {entry_table} (user_id, post_id, pub_date) '
+            f'SELECT user_id, post_id, pub_date FROM ('
+            f'  SELECT f.user_id, p.id AS post_id, p.pub_date, ROW_NUMBER() '
+            f'  OVER (PARTITION BY f.user_id '
+            f'        ORDER BY p.pub_date DESC, p.id DESC) AS position '
+            f'  FROM {Follow._meta.db_table} f '
+            f'  JOIN {Post._meta.db_table} p ON p.author_id = f.author_id'
+            f') ranked WHERE position <= %s',
+            [FEED_MAX_ENTRIES]
+        )
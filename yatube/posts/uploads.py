@@ -0,0 +1,140 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from PIL import Image, ImageOps, ImageSequence
+
+# больше стольких байт картинку не дочитываем
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+# больше стольких пикселей картинку не декодируем (защита от «бомб»)
+POST_IMAGE_MAX_PIXELS = 40_000_000
+# длинная сторона сохраняемого оригинала
+POST_IMAGE_MAX_SIDE = 2560
+JPEG_QUALITY = 90
+# метаданные, из-за которых картинка пересохраняется
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment', 'photoshop')
+# форматы, которые сохраняются как есть; остальные - в JPEG
+KEEP_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+# форматы, анимация в которых пересохраняется целиком; из остальных
+# (MPO, многостраничный TIFF) берётся первый кадр
+ANIMATED_FORMATS = {'GIF', 'PNG', 'WEBP'}
+# длительность кадра в мс, если файл её не указал
+DEFAULT_FRAME_DURATION = 100
+
+ERROR_TOO_MANY_BYTES = 'Файл больше {limit} МБ'
+ERROR_TOO_MANY_PIXELS = 'Картинка больше {limit} Мп'
+
+
+def too_many_bytes_message():
+    return ERROR_TOO_MANY_BYTES.format(limit=POST_IMAGE_MAX_BYTES // 2 ** 20)
+
+
+class ImageSizeLimitHandler(FileUploadHandler):
+    """Перестаёт принимать файл, как только он превысил
+    POST_IMAGE_MAX_BYTES: остаток тела запроса вычитывается впустую,
+    а имя поля запоминается в request.oversized_uploads для формы.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > POST_IMAGE_MAX_BYTES:
+            if not hasattr(self.request, 'oversized_uploads'):
+                self.request.oversized_uploads = set()
+            self.request.oversized_uploads.add(self.field_name)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def has_metadata(image):
+    return any(key in image.info for key in METADATA_KEYS) or (
+        image.format == 'JPEG' and bool(image.getexif()))
+
+
+def save_still(image, buffer, image_format):
+    """Поворачивает по EXIF, уменьшает и сохраняет без метаданных"""
+    image.draft('RGB', (POST_IMAGE_MAX_SIDE, POST_IMAGE_MAX_SIDE))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((POST_IMAGE_MAX_SIDE, POST_IMAGE_MAX_SIDE))
+    # часть кодировщиков берёт метаданные из info, а не из параметров
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    options = {}
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = {'quality': JPEG_QUALITY, 'optimize': True}
+    if 'icc_profile' in image.info:
+        options['icc_profile'] = image.info['icc_profile']
+    image.save(buffer, image_format, **options)
+    return image
+
+
+def save_animation(image, buffer, image_format):
+    """Пересохраняет все кадры, уменьшенные до POST_IMAGE_MAX_SIDE.
+
+    Кадры собираются заново без info, поэтому EXIF, XMP и комментарии
+    исходного файла в результат не попадают.
+    """
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', DEFAULT_FRAME_DURATION))
+        frame = frame.convert('RGBA')
+        frame.info = {}
+        frame.thumbnail((POST_IMAGE_MAX_SIDE, POST_IMAGE_MAX_SIDE))
+        frames.append(frame)
+    options = {}
+    if 'loop' in image.info:
+        options['loop'] = image.info['loop']
+    frames[0].save(
+        buffer, image_format, save_all=True, append_images=frames[1:],
+        duration=durations, **options
+    )
+    return frames[0]
+
+
+def process_image(upload):
+    """Проверяет загруженную картинку и готовит её к сохранению.
+
+    Возвращает (файл, ширина, высота). Картинка без метаданных и не
+    больше POST_IMAGE_MAX_SIDE остаётся как есть; иначе она
+    поворачивается по EXIF, уменьшается и пересохраняется без
+    метаданных, анимация - покадрово. Размер проверяется по заголовку
+    до декодирования, у анимации - суммарно по всем кадрам. Для JPEG
+    декодирование сразу идёт в уменьшенном масштабе (draft), так что
+    большой оригинал не разворачивается в памяти целиком.
+    """
+    if upload.size > POST_IMAGE_MAX_BYTES:
+        raise ValidationError(too_many_bytes_message())
+    upload.seek(0)
+    image = Image.open(upload)
+    width, height = image.size
+    animated = (
+        getattr(image, 'is_animated', False)
+        and image.format in ANIMATED_FORMATS
+    )
+    frames = image.n_frames if animated else 1
+    if width * height * frames > POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(ERROR_TOO_MANY_PIXELS.format(
+            limit=POST_IMAGE_MAX_PIXELS // 10 ** 6))
+    oversized = max(width, height) > POST_IMAGE_MAX_SIDE
+    if not (oversized or has_metadata(image)):
+        upload.seek(0)
+        return upload, width, height
+    image_format = image.format if image.format in KEEP_FORMATS else 'JPEG'
+    name = os.path.splitext(upload.name)[0] + KEEP_FORMATS[image_format]
+    # большой результат уходит из памяти во временный файл
+    buffer = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    if animated:
+        image = save_animation(image, buffer, image_format)
+    else:
+        image = save_still(image, buffer, image_format)
+    output = InMemoryUploadedFile(
+        buffer, 'image', name, Image.MIME[image_format], buffer.tell(), None)
+    output.seek(0)
+    return output, image.width, image.height
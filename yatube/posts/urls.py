@@ -7,6 +7,7 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='main'),
+    path('popular/', views.popular, name='popular'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('create/', views.post_create, name='post_create'),
@@ -15,7 +16,13 @@ urlpatterns = [
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -25,5 +32,20 @@ urlpatterns = [
         'profile/<str:username>/unfollow/',
         views.profile_unfollow,
         name='profile_unfollow'
-    )
+    ),
+    path(
+        'cache-stats/', views.page_cache_stats, name='page_cache_stats'
+    ),
+    path('rss/', views.index_rss, name='index_rss'),
+    path('atom/', views.index_atom, name='index_atom'),
+    path('group/<slug:slug>/rss/', views.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', views.group_atom, name='group_atom'),
+    path(
+        'profile/<str:username>/rss/', views.profile_rss, name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        views.profile_atom,
+        name='profile_atom'
+    ),
 ]
@@ -1,11 +1,191 @@
-from django.core.paginator import Paginator
+import math
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.http import (
+    urlsafe_base64_decode,
+    urlsafe_base64_encode,
+)
 
 # количество постов на страницу
 POSTS_PER_PAGE = 10
+# количество комментариев на страницу поста
+COMMENTS_PER_PAGE = 20
+# направления перехода по курсору
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+# разделитель полей внутри курсора
+CURSOR_SEPARATOR = '|'
 
 
-def paginator(request, list):
-    paginator = Paginator(list, POSTS_PER_PAGE)
+def encode_cursor(obj, direction, key_field='pub_date'):
+    """Кодирует позицию объекта (key_field, id) в непрозрачный курсор"""
+    value = getattr(obj, key_field)
+    value = value.isoformat() if hasattr(value, 'isoformat') else repr(value)
+    raw = CURSOR_SEPARATOR.join((direction, value, str(obj.pk)))
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def parse_rank(value):
+    """Ключ-число из курсора; NaN и бесконечности не принимаются"""
+    rank = float(value)
+    return rank if math.isfinite(rank) else None
+
+
+def decode_cursor(cursor, parse_key=parse_datetime):
+    """Разбирает курсор, при ошибке возвращает None"""
+    try:
+        raw = urlsafe_base64_decode(cursor).decode()
+        direction, value, pk = raw.split(CURSOR_SEPARATOR)
+        key = parse_key(value)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or key is None:
+        return None
+    return direction, key, pk
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации: без номера и общего количества"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = None
+        self.previous_cursor = None
+        if object_list and has_next:
+            self.next_cursor = paginator.cursor_for(
+                object_list[-1], CURSOR_NEXT)
+        if object_list and has_previous:
+            self.previous_cursor = paginator.cursor_for(
+                object_list[0], CURSOR_PREVIOUS)
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (key_field, id), по умолчанию в порядке убывания.
+
+    Выбирает только строки следующей страницы (per_page + 1, чтобы узнать,
+    есть ли ещё), не выполняя ни COUNT, ни OFFSET.
+    """
+
+    def __init__(self, object_list, per_page, key_field='pub_date',
+                 descending=True, parse_key=parse_datetime, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key_field = key_field
+        self.descending = descending
+        self.parse_key = parse_key
+
+    def _check_object_list_is_ordered(self):
+        # порядок задаётся при выборке страницы, см. _ordered
+        pass
+
+    def cursor_for(self, obj, direction):
+        return encode_cursor(obj, direction, self.key_field)
+
+    def get_page(self, cursor):
+        decoded = decode_cursor(cursor, self.parse_key) if cursor else None
+        if decoded is None:
+            return self._first_page()
+        direction, key, pk = decoded
+        if direction == CURSOR_NEXT:
+            return self._next_page(key, pk)
+        return self._previous_page(key, pk)
+
+    def _limit(self, queryset):
+        return list(queryset[:self.per_page + 1])
+
+    def _ordered(self, backwards=False):
+        prefix = '-' if self.descending != backwards else ''
+        return self.object_list.order_by(
+            f'{prefix}{self.key_field}', f'{prefix}id')
+
+    def _beyond(self, key, pk, backwards=False):
+        """Условие «строка дальше (key, pk)» в направлении листания"""
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        return Q(**{f'{self.key_field}__{lookup}': key}) | Q(
+            **{self.key_field: key, f'id__{lookup}': pk})
+
+    def _first_page(self):
+        rows = self._limit(self._ordered())
+        return CursorPage(
+            rows[:self.per_page], self,
+            has_next=len(rows) > self.per_page, has_previous=False)
+
+    def _next_page(self, key, pk):
+        rows = self._limit(self._ordered().filter(self._beyond(key, pk)))
+        return CursorPage(
+            rows[:self.per_page], self,
+            has_next=len(rows) > self.per_page, has_previous=True)
+
+    def _previous_page(self, key, pk):
+        rows = self._limit(
+            self._ordered(backwards=True).filter(
+                self._beyond(key, pk, backwards=True)))
+        page = rows[:self.per_page]
+        page.reverse()
+        return CursorPage(
+            page, self,
+            has_next=True, has_previous=len(rows) > self.per_page)
+
+
+def paginator(request, list, key_field='pub_date', parse_key=parse_datetime,
+              keyset_first_page=True):
+    """Возвращает страницу постов в порядке убывания (key_field, id).
+
+    По умолчанию и с ?cursor=... используется курсорная пагинация: первая
+    страница - это один LIMIT-запрос без COUNT. Только явный ?page=N
+    (и первая страница при keyset_first_page=False) идёт через Paginator
+    с COUNT и OFFSET; его ссылки «вперёд/назад» тоже ведут на курсоры.
+    """
+    list = list.order_by(f'-{key_field}', '-id')
+    cursor = request.GET.get('cursor')
     page_number = request.GET.get('page')
+    if cursor or (keyset_first_page and not page_number):
+        return CursorPaginator(
+            list, POSTS_PER_PAGE, key_field=key_field, parse_key=parse_key
+        ).get_page(cursor)
+    paginator = Paginator(list, POSTS_PER_PAGE)
     page_obj = paginator.get_page(page_number)
+    page_obj.next_cursor = None
+    page_obj.previous_cursor = None
+    if page_obj.has_next():
+        page_obj.next_cursor = encode_cursor(
+            page_obj[-1], CURSOR_NEXT, key_field)
+    if page_obj.has_previous():
+        page_obj.previous_cursor = encode_cursor(
+            page_obj[0], CURSOR_PREVIOUS, key_field)
     return page_obj
+
+
+def comments_page(post, cursor=None):
+    """Страница комментариев поста от старых к новым по (created, id).
+
+    Авторы выбираются тем же запросом, а размер выборки не зависит
+    от общего числа комментариев.
+    """
+    comments = post.comments.select_related('author')
+    return CursorPaginator(
+        comments, COMMENTS_PER_PAGE, key_field='created', descending=False
+    ).get_page(cursor)
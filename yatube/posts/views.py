@@ -3,10 +3,39 @@ from django.shortcuts import (
     get_object_or_404,
     redirect
 )
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
-from django.views.decorators.cache import cache_page
-from .utils import paginator
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils.http import urlencode
+from core.replicas import read_only_view
+from .counters import get_author_stats
+from .follows import is_following
+from .popularity import counts_views
+from .feeds import (
+    AuthorAtomFeed,
+    AuthorFeed,
+    GroupAtomFeed,
+    GroupFeed,
+    IndexAtomFeed,
+    IndexFeed,
+)
+from .page_cache import (
+    cached_page,
+    page_validators,
+    index_scopes,
+    popular_scopes,
+    group_scopes,
+    profile_scopes,
+    post_detail_scopes,
+    post_comments_scopes,
+    follow_index_scopes,
+    get_stats,
+)
+from .search import SearchPaginator
+from .thumbnails import prefetch_thumbnails, schedule_thumbnails
+from .utils import comments_page, paginator, parse_rank
 from .models import (
     Post,
     Group,
@@ -18,11 +47,14 @@ from .forms import (
 )
 from .const import (
     INDEX_TEMPLATE,
+    POPULAR_TEMPLATE,
     GROUP_LIST_TEMPLATE,
     PROFILE_TEMPLATE,
     POST_DETAIL_TEMPLATE,
     POST_CREATE_TEMPLATE,
     FOLLOW_INDEX_TEMPLATE,
+    SEARCH_TEMPLATE,
+    COMMENT_LIST_TEMPLATE,
 
     PROFILE_URL_NAME,
     POST_DETAIL_URL_NAME,
@@ -31,20 +63,41 @@ from .const import (
 User = get_user_model()
 
 
-@cache_page(20)
+@read_only_view
+@page_validators(index_scopes)
+@cached_page(index_scopes)
 def index(request):
     post_list = Post.objects.select_related('author', 'group').all()
     page_obj = paginator(request, post_list)
+    prefetch_thumbnails(page_obj)
     context = {
         'page_obj': page_obj,
     }
     return render(request, INDEX_TEMPLATE, context)
 
 
+@read_only_view
+@page_validators(popular_scopes)
+@cached_page(popular_scopes)
+def popular(request):
+    post_list = Post.objects.select_related('author', 'group').all()
+    page_obj = paginator(
+        request, post_list, key_field='popularity', parse_key=parse_rank)
+    prefetch_thumbnails(page_obj)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, POPULAR_TEMPLATE, context)
+
+
+@read_only_view
+@page_validators(group_scopes)
+@cached_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author').all()
     page_obj = paginator(request, post_list)
+    prefetch_thumbnails(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj
@@ -52,28 +105,35 @@ def group_posts(request, slug):
     return render(request, GROUP_LIST_TEMPLATE, context)
 
 
+@read_only_view
+@page_validators(profile_scopes)
+@cached_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
     post_list = author.posts.select_related('group').all()
-    is_following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author).exists()
-    )
-    following = True if is_following else False
     page_obj = paginator(request, post_list)
+    prefetch_thumbnails(page_obj)
     context = {
         'page_obj': page_obj,
-        'following': following,
-        'author': author
+        'following': is_following(request.user, author),
+        'author': author,
+        'stats': get_author_stats(author)
     }
     return render(request, PROFILE_TEMPLATE, context)
 
 
+@counts_views
+@read_only_view
+@page_validators(post_detail_scopes)
+@cached_page(post_detail_scopes)
 def post_detail(request, post_id):
-    post = Post.objects.select_related('author', 'group').get(id=post_id)
+    post = Post.objects.select_related(
+        'author__stats', 'group').get(id=post_id)
+    prefetch_thumbnails([post])
     form = CommentForm()
-    comments = post.comments.all()
-    posts_count = post.author.posts.count()
+    comments = comments_page(post)
+    posts_count = get_author_stats(post.author).posts_count
     context = {
         'post': post,
         'posts_count': posts_count,
@@ -83,42 +143,62 @@ def post_detail(request, post_id):
     return render(request, POST_DETAIL_TEMPLATE, context)
 
 
+@read_only_view
+@page_validators(post_comments_scopes)
+@cached_page(post_comments_scopes)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(post, request.GET.get('cursor'))
+    }
+    return render(request, COMMENT_LIST_TEMPLATE, context)
+
+
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
-        files=request.FILES or None
+        files=request.FILES or None,
+        oversized_uploads=getattr(request, 'oversized_uploads', ())
     )
     context = {'form': form}
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnails(post)
         return redirect(PROFILE_URL_NAME, request.user.username)
     return render(request, POST_CREATE_TEMPLATE, context)
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = Post.objects.get(id=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect(POST_DETAIL_URL_NAME, post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        oversized_uploads=getattr(request, 'oversized_uploads', ())
     )
     context = {
         'form': form,
         'is_edit': True
     }
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect(POST_DETAIL_URL_NAME, post_id)
     return render(request, POST_CREATE_TEMPLATE, context)
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = Post.objects.get(id=post_id)
     form = CommentForm(request.POST or None)
@@ -130,10 +210,17 @@ def add_comment(request, post_id):
     return redirect(POST_DETAIL_URL_NAME, post_id)
 
 
+@read_only_view
 @login_required
+@page_validators(follow_index_scopes)
+@cached_page(follow_index_scopes)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request, post_list)
+    entries = request.user.feed_entries.select_related(
+        'post__author', 'post__group')
+    # лента ограничена FEED_MAX_ENTRIES, так что COUNT по ней дешёвый
+    page_obj = paginator(request, entries, keyset_first_page=False)
+    page_obj.object_list = [entry.post for entry in page_obj]
+    prefetch_thumbnails(page_obj)
     context = {
         'page_obj': page_obj,
     }
@@ -141,6 +228,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -149,7 +237,40 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect(PROFILE_URL_NAME, username)
+
+
+@read_only_view
+@page_validators(index_scopes)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = SearchPaginator(query).get_page(request.GET.get('cursor'))
+    prefetch_thumbnails(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'pagination_query': urlencode({'q': query}) + '&'
+    }
+    return render(request, SEARCH_TEMPLATE, context)
+
+
+@staff_member_required
+def page_cache_stats(request):
+    return JsonResponse(get_stats())
+
+
+def cached_feed(feed, get_scopes):
+    return read_only_view(
+        page_validators(get_scopes)(cached_page(get_scopes)(feed)))
+
+
+index_rss = cached_feed(IndexFeed(), index_scopes)
+index_atom = cached_feed(IndexAtomFeed(), index_scopes)
+group_rss = cached_feed(GroupFeed(), group_scopes)
+group_atom = cached_feed(GroupAtomFeed(), group_scopes)
+profile_rss = cached_feed(AuthorFeed(), profile_scopes)
+profile_atom = cached_feed(AuthorAtomFeed(), profile_scopes)
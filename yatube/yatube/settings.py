@@ -38,11 +38,15 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
 
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +60,7 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +87,40 @@ DATABASES = {
     }
 }
 
+# «боевой» профиль SQLite: WAL, PRAGMA при подключении и постоянные
+# соединения; включается переменной окружения YATUBE_SQLITE_PRODUCTION=1
+SQLITE_PRODUCTION = os.environ.get('YATUBE_SQLITE_PRODUCTION') == '1'
+SQLITE_PRAGMAS = {
+    # читатели не блокируются писателями
+    'journal_mode': 'WAL',
+    # в режиме WAL NORMAL надёжен и не делает fsync на каждый коммит
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # отрицательное значение - размер в КиБ
+    'cache_size': -64 * 1024,
+    # сколько миллисекунд ждать блокировку вместо ошибки
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_CONN_MAX_AGE = 60
+
+if SQLITE_PRODUCTION:
+    DATABASES['default']['CONN_MAX_AGE'] = SQLITE_CONN_MAX_AGE
+
+# реплики только для чтения; локально - второй файл SQLite,
+# который обновляет команда sync_replica
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_DATABASES = []
+REPLICA_STICKY_SECONDS = 5
+REPLICA_MAX_LAG = 5
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES = ['replica']
+
 
 # Password validation
 
@@ -119,13 +157,52 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# картинки больше posts.uploads.POST_IMAGE_MAX_BYTES не дочитываются
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.ImageSizeLimitHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 # e-mail engine
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# письма ставятся в очередь задач, отправляет их воркер (run_jobs)
+EMAIL_BACKEND = 'jobs.backends.QueuedEmailBackend'
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# очередь фоновых задач
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_TIMEOUT = 300
+
+# пороги, после которых запрос пишется в лог метрик
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_MAX_REQUEST_QUERIES = 50
+
+# локальный кэш годится для одного процесса; при нескольких процессах
+# нужен общий (manage.py check --deploy предупредит), иначе
+# сбрасываемые данные живут не дольше core.caches.LOCAL_CACHE_TIMEOUT
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # метаданные миниатюр sorl-thumbnail; в бою - общий для процессов
+    # бэкенд (Redis, memcached), чтобы предзагрузка попадала в кэш
+    'thumbnails': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'thumbnails',
+    },
 }
+
+# адрес memcached (например, 127.0.0.1:11211), нужен python-memcached
+if os.environ.get('YATUBE_MEMCACHED'):
+    for alias, prefix in (('default', ''), ('thumbnails', 'thumbnails')):
+        CACHES[alias] = {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ['YATUBE_MEMCACHED'],
+            'KEY_PREFIX': prefix,
+        }
+
+THUMBNAIL_KVSTORE = 'posts.kvstore.PrefetchKVStore'
+THUMBNAIL_CACHE = 'thumbnails'